@@ -0,0 +1,247 @@
+"""A Game motor forró útvonalainak mikrobenchmarkja regressziós küszöbbel.
+
+Futtatás a projekt gyökeréből:
+
+    python benchmarks/bench_engine.py            # összevetés a baseline-nal
+    python benchmarks/bench_engine.py --save     # új baseline rögzítése
+
+Minden mérés rögzített seeddel és előre összerakott (stacked) cipővel fut;
+az eredmény műveletenkénti nanoszekundum (a repeat-ek minimuma). A baseline
+gépfüggő: ugyanazon a gépen rögzítsd, ahol az összevetés is fut.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from my_app.backend.card import RANKS, SUITS  # noqa: E402
+from my_app.backend import state_codec  # noqa: E402
+from my_app.backend.game import Game  # noqa: E402
+from my_app.backend.shoe import MAX_DECKS, Shoe  # noqa: E402
+
+SEED = 20240501
+BET = 10
+DEFAULT_NUMBER = 300
+DEFAULT_REPEAT = 15
+DEFAULT_THRESHOLD = 0.25  # ennyivel lassabb mérés már regresszió
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def card(label):
+    """'8♥' alakú címkéből lapkód (rang, szín)."""
+    return RANKS.index(label[:-1]) * len(SUITS) + SUITS.index(label[-1])
+
+
+# Osztási sorrend: játékos 1. lap, osztó lefordított lap, játékos 2. lap, osztó felfordított lap
+STACK_PLAIN = [card(c) for c in ("2♥", "10♠", "3♦", "6♣", "4♥", "5♠", "K♦", "9♣")]
+STACK_STAND = [card(c) for c in ("10♥", "10♠", "7♦", "6♣", "2♥", "3♠", "4♦", "9♣")]
+STACK_SPLIT = [card(c) for c in ("8♥", "10♠", "8♦", "6♣", "3♥", "2♠", "K♦", "9♣")]
+
+
+def stacked_game(prefix):
+    """Game 8 paklis cipővel, amelynek eleje a megadott lapsorrend."""
+    game = Game(MAX_DECKS, rng=random.Random(SEED))
+    order = prefix + Shoe.order_from_seed(SEED, MAX_DECKS)
+    game.shoe = Shoe.from_cards(order[: game.shoe.size], MAX_DECKS)
+    game.set_bet(BET)
+    game.set_bet_list(BET)
+
+    return game
+
+
+def dealt_game(prefix):
+    game = stacked_game(prefix)
+    game.initialize_new_round()
+
+    return game
+
+
+def stood_game():
+    game = dealt_game(STACK_STAND)
+    game.stand()
+
+    return game
+
+
+def split_game():
+    game = dealt_game(STACK_SPLIT)
+    game.split_hand()
+
+    return game
+
+
+def split_waiting_game():
+    # Split után az első kéz megállt, a második vár az aktiválásra
+    game = split_game()
+    game.add_to_players_list_by_stand()
+
+    return game
+
+
+def seeded_split_game():
+    # Éles jellegű állapot: seedből kevert cipő, splitelt kéz, várakozó második kéz
+    game = Game(MAX_DECKS, rng=random.Random(SEED))
+    game.set_bet(BET)
+    game.set_bet_list(BET)
+    game.initialize_new_round()
+    while not game.player.can_split:
+        game.initialize_new_round()
+    game.split_hand()
+    game.add_to_players_list_by_stand()
+
+    return game
+
+
+def _shared(make):
+    # Nem módosító műveletekhez: ugyanaz a példány minden iterációban
+    def factory():
+        game = make()
+        return lambda: game
+
+    return factory
+
+
+def _fresh(make):
+    return lambda: make
+
+
+def benchmarks():
+    """(név, állapotgyár, művelet) hármasok; az állapotgyár mérésen kívül fut."""
+    serialized = json.loads(json.dumps(seeded_split_game().serialize()))
+    encoded = state_codec.encode(seeded_split_game())
+
+    return [
+        ("initialize_new_round", _fresh(lambda: stacked_game(STACK_PLAIN)),
+         Game.initialize_new_round),
+        ("hit", _fresh(lambda: dealt_game(STACK_PLAIN)), Game.hit),
+        ("stand", _fresh(lambda: dealt_game(STACK_STAND)), Game.stand),
+        ("rewards", _fresh(stood_game), Game.rewards),
+        ("split_hand", _fresh(lambda: dealt_game(STACK_SPLIT)), Game.split_hand),
+        ("add_split_player_to_game", _fresh(split_waiting_game),
+         Game.add_split_player_to_game),
+        ("serialize", _shared(seeded_split_game), Game.serialize),
+        ("deserialize", _shared(lambda: serialized), Game.deserialize),
+        ("state_codec_encode", _shared(seeded_split_game), state_codec.encode),
+        ("state_codec_decode", _shared(lambda: encoded), state_codec.decode),
+        ("serialize_initial_and_hit_state", _shared(lambda: dealt_game(STACK_PLAIN)),
+         Game.serialize_initial_and_hit_state),
+        ("serialize_for_insurance", _shared(lambda: dealt_game(STACK_PLAIN)),
+         Game.serialize_for_insurance),
+        ("serialize_double_state", _shared(lambda: dealt_game(STACK_PLAIN)),
+         Game.serialize_double_state),
+        ("serialize_reward_state", _shared(stood_game), Game.serialize_reward_state),
+        ("serialize_split_hand", _shared(split_game), Game.serialize_split_hand),
+        ("serialize_add_to_players_list_by_stand", _shared(split_waiting_game),
+         Game.serialize_add_to_players_list_by_stand),
+        ("serialize_add_player_from_players", _shared(split_waiting_game),
+         Game.serialize_add_player_from_players),
+        ("serialize_split_stand_and_rewards", _shared(split_waiting_game),
+         Game.serialize_split_stand_and_rewards),
+    ]
+
+
+def measure(factory, operation, number, repeat):
+    """A repeat db mérés legjobbja, műveletenkénti nanoszekundumban."""
+    best = None
+    for _ in range(repeat):
+        make = factory()
+        states = [make() for _ in range(number)]
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            started = time.perf_counter_ns()
+            for state in states:
+                operation(state)
+            elapsed = time.perf_counter_ns() - started
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best / number
+
+
+def run(number=DEFAULT_NUMBER, repeat=DEFAULT_REPEAT, only=None):
+    results = {}
+    for name, factory, operation in benchmarks():
+        if only and name not in only:
+            continue
+        results[name] = measure(factory, operation, number, repeat)
+
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Regressziók listája: (név, baseline ns, mostani ns, arány)."""
+    regressions = []
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if reference and current > reference * (1 + threshold):
+            regressions.append((name, reference, current, current / reference))
+
+    return regressions
+
+
+def load_baseline(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def save_baseline(path, results, number, repeat):
+    data = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "number": number,
+        "repeat": repeat,
+        "results": {name: round(ns, 1) for name, ns in results.items()},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=DEFAULT_NUMBER)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="baseline felülírása")
+    parser.add_argument("only", nargs="*", help="csak ezek a mérések")
+    args = parser.parse_args()
+
+    results = run(args.number, args.repeat, set(args.only))
+    baseline = {}
+    if not args.save and os.path.exists(args.baseline):
+        baseline = load_baseline(args.baseline)
+
+    for name, ns in results.items():
+        reference = baseline.get(name)
+        change = f"{(ns / reference - 1) * 100:+7.1f}%" if reference else ""
+        print(f"{name:42s} {ns:12,.0f} ns/op {change}")
+
+    if args.save:
+        save_baseline(args.baseline, results, args.number, args.repeat)
+        print(f"Baseline mentve: {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.threshold)
+    for name, reference, current, ratio in regressions:
+        print(
+            f"REGRESSZIÓ: {name}: {reference:,.0f} -> {current:,.0f} ns/op ({ratio:.2f}x)"
+        )
+    if regressions:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
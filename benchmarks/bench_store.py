@@ -0,0 +1,96 @@
+"""A játékállapot tárolók (GameStateStore backendek) kérésenkénti költsége.
+
+Futtatás a projekt gyökeréből:
+
+    python benchmarks/bench_store.py                       # memory és file
+    python benchmarks/bench_store.py --redis-url redis://localhost:6379/15
+
+Egy mérés egy kérés tárolóoldali útja: load, egy mező módosítása (tét),
+save. Backendenként két változat: L1 cache nélkül (teljes beolvasás és
+dekódolás) és L1 cache-sel. A memory backend a nulla késleltetésű alap;
+a többi sor mellett a hozzá képesti többlet látszik.
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from bench_engine import seeded_split_game  # noqa: E402
+from my_app.backend.game_store import (  # noqa: E402
+    DEFAULT_CACHE_SIZE,
+    FileGameStore,
+    MemoryGameStore,
+    RedisGameStore,
+)
+
+DEFAULT_NUMBER = 2000
+DEFAULT_REPEAT = 5
+USER_ID = "bench-user"
+
+
+def request_cycle(store):
+    game, stored = store.load(USER_ID)
+    game.bet += 1
+    store.save(USER_ID, game, stored)
+
+
+def measure(store, number, repeat):
+    """A repeat db mérés legjobbja, kérésenkénti mikroszekundumban."""
+    store.save(USER_ID, seeded_split_game())
+    best = None
+    for _ in range(repeat):
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            started = time.perf_counter_ns()
+            for _ in range(number):
+                request_cycle(store)
+            elapsed = time.perf_counter_ns() - started
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best / number / 1000
+
+
+def stores(directory, redis_url):
+    """(név, gyár) párok; a gyár a cache méretet kapja."""
+    yield "memory", MemoryGameStore
+    yield "file", lambda size: FileGameStore(os.path.join(directory, "bench.log"), size)
+    if redis_url:
+        from redis import Redis
+
+        client = Redis.from_url(redis_url)
+        client.ping()
+        yield "redis", lambda size: RedisGameStore(client, size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=DEFAULT_NUMBER)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--redis-url", default=os.environ.get("BENCH_REDIS_URL"))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        baseline = {}
+        for name, factory in stores(directory, args.redis_url):
+            for label, cache_size in (("no cache", 0), ("L1 cache", DEFAULT_CACHE_SIZE)):
+                store = factory(cache_size)
+                us = measure(store, args.number, args.repeat)
+                store.delete(USER_ID)
+                reference = baseline.setdefault(label, us)
+                overhead = f"{us - reference:+9.1f} µs" if name != "memory" else ""
+                print(f"{name:8s} {label:9s} {us:10.1f} µs/kérés {overhead}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+from enum import IntEnum
+
+
+class Action(IntEnum):
+    """A játékos döntése egy lejátszható kéznél."""
+
+    STAND = 0
+    HIT = 1
+    DOUBLE = 2  # Csak két lapnál; különben HIT
+    SPLIT = 3  # Csak párnál, a split limit alatt
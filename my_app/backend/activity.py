@@ -0,0 +1,59 @@
+import threading
+import time
+
+DEFAULT_FLUSH_INTERVAL = 30.0  # másodperc két tömeges mentés között
+DEFAULT_MAX_PENDING = 1000  # ennyi várakozó felhasználónál azonnal menteni kell
+
+
+class ActivityBuffer:
+    """Felhasználónként az utolsó aktivitás ideje, késleltetett tömeges mentéshez.
+
+    A kérések csak a memóriában jegyzik fel az időpontot (touch); a mentést
+    a hívó végzi, amikor a due() igaz: a drain() kiüríti a puffert, hiba
+    esetén a restore() visszateszi. Workerenként egy példány; leállás vagy
+    összeomlás esetén legfeljebb az utolsó flush_interval aktivitása vész el.
+    """
+
+    def __init__(
+        self,
+        flush_interval=DEFAULT_FLUSH_INTERVAL,
+        max_pending=DEFAULT_MAX_PENDING,
+        clock=time.monotonic,
+    ):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._clock = clock
+        self._pending = {}  # user_id -> datetime
+        self._last_flush = clock()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def touch(self, user_id, when):
+        with self._lock:
+            previous = self._pending.get(user_id)
+            if previous is None or previous < when:
+                self._pending[user_id] = when
+
+    def due(self):
+        if not self._pending:
+            return False
+        return (
+            len(self._pending) >= self.max_pending
+            or self._clock() - self._last_flush >= self.flush_interval
+        )
+
+    def drain(self):
+        """A várakozó időpontok {user_id: datetime} alakban; a puffer kiürül."""
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+            self._last_flush = self._clock()
+
+        return pending
+
+    def restore(self, pending):
+        """Sikertelen mentés után visszatöltés; az újabb időpont marad meg."""
+        for user_id, when in pending.items():
+            self.touch(user_id, when)
@@ -0,0 +1,95 @@
+from functools import lru_cache
+
+from my_app.backend.action import Action
+from my_app.backend.card import CARD_VALUES
+from my_app.backend.dealer_odds import BLACKJACK, pack, unpack
+from my_app.backend.hand import BLACKJACK_LIMIT
+from my_app.backend.simulator import MULTI_CARD, PAIR, TWO_CARD
+from my_app.backend.strategy import UpcardEv
+
+ADVICE_CACHE_SIZE = 256
+
+_ACTION_NAMES = {
+    Action.STAND: "stand",
+    Action.HIT: "hit",
+    Action.DOUBLE: "double",
+    Action.SPLIT: "split",
+}
+
+
+def unseen_composition(game):
+    """A játékos szemszögéből ismeretlen lapok értékenként: a cipő maradéka és a lefordított lap."""
+    counts = game.shoe.rank_counts[:9]
+    counts.append(sum(game.shoe.rank_counts[9:]))  # 10, J, Q, K
+    counts[CARD_VALUES[game.dealer.hand.cards[0]] - 1] += 1
+
+    return counts
+
+
+@lru_cache(maxsize=ADVICE_CACHE_SIZE)
+def _upcard_ev(key, upcard):
+    # Összetételenként egy példány: ugyanazon állapot ismételt lekérdezése
+    # ingyenes, új lap után új kulcs keletkezik, a régi kiöregszik.
+    return UpcardEv(upcard, unpack(key))
+
+
+def action_evs(game, table=None):
+    """Az aktuális kéz legális döntéseinek EV-je a kéz tétjének arányában.
+
+    A biztosítás mellékfogadás, EV-je az alaptét arányában értendő, és
+    nem vesz részt a legjobb döntés kiválasztásában. table (StrategyTable)
+    megadásakor az alapstratégia döntése is benne van ("basic").
+    """
+    if not game.is_round_active or len(game.dealer.hand) < 2:
+        raise ValueError("No active round to advise on.")
+
+    seat = game.player
+    hand = seat.hand
+    if len(hand) < 2:
+        raise ValueError("The current hand is waiting for its second card.")
+
+    upcard = CARD_VALUES[game.dealer.upcard]
+    ev = _upcard_ev(pack(unseen_composition(game)), upcard)
+    has_ace = hand.aces > 0
+    two = len(hand) == 2
+
+    evs = {Action.STAND: ev.stand(hand.total)}
+    if hand.total < BLACKJACK_LIMIT:
+        evs[Action.HIT] = ev.hit(hand.hard_total, has_ace)
+        if two:
+            evs[Action.DOUBLE] = ev.double(hand.hard_total, has_ace)
+    splits_left = game.max_splits - game.split_count
+    can_split = two and game.can_split(hand) and splits_left > 0
+    if can_split:
+        evs[Action.SPLIT] = ev.split(CARD_VALUES[hand.cards[0]], splits_left)
+
+    best = max(evs, key=evs.get)
+    advice = {
+        "evs": {_ACTION_NAMES[action]: value for action, value in evs.items()},
+        "best": _ACTION_NAMES[best],
+    }
+    # Biztosítás csak az eredeti, még érintetlen kéznél (split után hand_counter > 1)
+    if game.dealer.can_insure and two and game.hand_counter == 1:
+        # Game.insurance_request: osztói BJ-nél +tét, különben -ceil(tét / 2)
+        p = ev.dealer[BLACKJACK]
+        advice["evs"]["insurance"] = p - (1 - p) / 2
+        if table is not None:
+            advice["basic_insurance"] = table.should_insure(upcard)
+    if table is not None:
+        advice["basic"] = _ACTION_NAMES[_basic_action(hand, upcard, two, can_split, table)]
+
+    return advice
+
+
+def _basic_action(hand, upcard, two, can_split, table):
+    # Kikeresés a memóriába leképzett táblában, mint simulator._policy_action
+    if hand.total >= BLACKJACK_LIMIT:
+        return Action.STAND
+    category = PAIR if can_split else (TWO_CARD if two else MULTI_CARD)
+    action = table.action(hand.total, int(hand.is_soft), category, upcard)
+    if action == Action.DOUBLE and not two:
+        return Action.HIT
+    if action == Action.SPLIT and not can_split:
+        return Action.HIT
+
+    return Action(action)
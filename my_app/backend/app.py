@@ -2,25 +2,66 @@ import os
 import uuid
 import logging
 import math
+import time
+import atexit
 from functools import wraps
 from urllib.parse import urlparse
 from dotenv import load_dotenv
-from sqlalchemy import select
-from flask import Flask, current_app, json, jsonify, render_template, request, session
+import click
+from sqlalchemy import String, bindparam, column, or_, select, update, values
+from flask import Flask, current_app, g, jsonify, render_template, request, session
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime, timedelta, timezone
 from flask_session import Session
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.attributes import set_committed_value
 from psycopg2.errors import UniqueViolation
 
-from upstash_redis import Redis as UpstashRedisClient  # Upstash kliens átnevezve
-from redis import Redis as FlaskSessionRedisClient  # Hivatalos kliens importálva
-
-from my_app.backend.game import Game
+from redis import ConnectionPool, Redis, SSLConnection  # Hivatalos kliens importálva
+
+from my_app.backend.activity import DEFAULT_FLUSH_INTERVAL, ActivityBuffer
+from my_app.backend.advice import action_evs
+from my_app.backend.game import MAX_SPLITS, Game
+from my_app.backend.game_store import (
+    DEFAULT_CACHE_SIZE,
+    DEFAULT_SCAN_BATCH,
+    FileGameStore,
+    MemoryGameStore,
+    RedisGameStore,
+    StateConflict,
+)
+from my_app.backend.state_codec import DECODE_ERRORS
+from my_app.backend.strategy import DEFAULT_TABLE_PATH, StrategyTable
 
 load_dotenv()
 
 MINIMUM_BET = 1
+# Cipő beállítások: paklik száma (1-8) és a vágólap helye (a cipő hányad része)
+DECK_COUNT = int(os.environ.get("BLACKJACK_DECK_COUNT", 2))
+SHOE_PENETRATION = float(os.environ.get("BLACKJACK_SHOE_PENETRATION", 0.75))
+MAX_SPLIT_COUNT = int(os.environ.get("BLACKJACK_MAX_SPLITS", MAX_SPLITS))
+# Workerenként ennyi felhasználó Game objektuma marad memóriában (0: kikapcsolva)
+GAME_CACHE_SIZE = int(os.environ.get("BLACKJACK_GAME_CACHE_SIZE", DEFAULT_CACHE_SIZE))
+# Játékállapot tároló: "redis", "memory" (egy folyamat) vagy "file" (append-only napló);
+# üresen Redis, ha van kliens, különben memória
+GAME_STORE_BACKEND = os.environ.get("BLACKJACK_GAME_STORE", "")
+GAME_STORE_PATH = os.environ.get("BLACKJACK_GAME_STORE_PATH", "game_states.log")
+# Redisben a játékállapot lejárata másodpercben, minden hozzáféréskor megújul (0: nincs);
+# alapértelmezés a session élettartama, utána az állapot úgysem érhető el
+GAME_STATE_TTL = int(os.environ.get("BLACKJACK_GAME_STATE_TTL", 31 * 24 * 3600))
+# Ennyi nap tétlenség után a reaper törli a felhasználó játékállapotát
+GAME_STATE_IDLE_DAYS = float(os.environ.get("BLACKJACK_GAME_STATE_IDLE_DAYS", 31))
+# Párhuzamos módosítás (StateConflict) esetén ennyiszer fut le a teljes művelet
+GAME_SAVE_RETRIES = int(os.environ.get("BLACKJACK_GAME_SAVE_RETRIES", 3))
+# A last_activity időpontok workerenként ennyi másodpercenként, egy UPDATE-tel kerülnek be
+ACTIVITY_FLUSH_INTERVAL = float(
+    os.environ.get("BLACKJACK_ACTIVITY_FLUSH_SECONDS", DEFAULT_FLUSH_INTERVAL)
+)
+# A Redisben tartott token egyenlegek workerenként ennyi másodpercenként kerülnek
+# az adatbázisba (users.tokens)
+TOKEN_RECONCILE_INTERVAL = float(os.environ.get("BLACKJACK_TOKEN_RECONCILE_SECONDS", 30))
+# Előre generált stratégia tábla (python -m my_app.backend.strategy)
+STRATEGY_TABLE_PATH = os.environ.get("BLACKJACK_STRATEGY_TABLE", DEFAULT_TABLE_PATH)
 
 # =========================================================================
 # FLASK APPLICATION BASICS
@@ -41,75 +82,82 @@ app.config["SESSION_COOKIE_SECURE"] = os.environ.get("VERCEL", "False") == "True
 # =========================================================================
 UPSTASH_REDIS_URL = os.environ.get("UPSTASH_REDIS_URL")
 UPSTASH_REDIS_TOKEN = os.environ.get("UPSTASH_REDIS_TOKEN")
+# Helyi fejlesztéshez (pl. redis://localhost:6379/0); ha meg van adva, ez az elsődleges
+REDIS_URL = os.environ.get("REDIS_URL")
+REDIS_MAX_CONNECTIONS = int(os.environ.get("REDIS_MAX_CONNECTIONS", 20))
 
-# A Flask-Session csomag nem szereti a None-t, ezért alapértelmezettként
-# a "filesystem"-et használjuk. Ez a biztonságos fallback.
-# app.config["SESSION_TYPE"] = "filesystem"
-app.config["SESSION_TYPE"] = "redis"
-app.config["SESSION_REDIS"] = None
+# A Flask-Session Redis session-je csak sikeres ping után kapcsol be; addig
+# (és Redis nélkül, pl. memory/file játékállapot tárolóval) a Flask saját,
+# aláírt sütis session-je marad. SESSION_REDIS=None mellett a Flask-Session
+# a localhost Redishez fordulna, és minden kérés 500-zal állna meg.
 
-# Helyi kliens a Redis-ben tárolt játékállapot számára (ha a Redis működik)
-upstash_redis_client = None
 
-if not UPSTASH_REDIS_URL or not UPSTASH_REDIS_TOKEN:
-    print(
-        "!!! Hiba: UPSTASH_REDIS_URL vagy UPSTASH_REDIS_TOKEN nincs beállítva. Marad a Flask-Session alapértelmezett session (filesystem). !!!"
-    )
-else:
-    try:
-        # 1. Létrehozzuk az Upstash Redis klienst (Game State-hez)
-        upstash_redis_client = UpstashRedisClient(
-            url=UPSTASH_REDIS_URL, token=UPSTASH_REDIS_TOKEN
+def create_redis_pool():
+    """Tartós, workerenként közös kapcsolatkészlet (TCP, Upstash-nál TLS)."""
+    if REDIS_URL:
+        return ConnectionPool.from_url(
+            REDIS_URL, max_connections=REDIS_MAX_CONNECTIONS, health_check_interval=30
         )
 
-        # 2. A HOST és PORT kinyerése a szabványos urllib.parse használatával (ez a legbiztosabb)
-        parsed_url = urlparse(UPSTASH_REDIS_URL)
+    # A HOST és PORT kinyerése a szabványos urllib.parse használatával (ez a legbiztosabb)
+    parsed_url = urlparse(UPSTASH_REDIS_URL)
 
-        host = parsed_url.hostname
-        port = parsed_url.port if parsed_url.port is not None else 6379
-
-        # Ellenőrzés, hogy a host és a port sikerült-e kinyerni
-        if not host or not port:
-            raise ValueError(
-                f"Redis URL formátumhiba: Nem sikerült kinyerni a hostot ({host}) vagy a portot ({port}) a megadott URL-ből."
-            )
+    host = parsed_url.hostname
+    port = parsed_url.port if parsed_url.port is not None else 6379
 
-        # FlaskSessionRedisClient (standard redis-py) direkt inicializálása
-        flask_session_client = FlaskSessionRedisClient(
-            host=host,
-            port=port,
-            password=UPSTASH_REDIS_TOKEN,
-            ssl=True,  # Kötelező az Upstash-hoz (TLS)
-            ssl_cert_reqs="required",
+    # Ellenőrzés, hogy a host és a port sikerült-e kinyerni
+    if not host or not port:
+        raise ValueError(
+            f"Redis URL formátumhiba: Nem sikerült kinyerni a hostot ({host}) vagy a portot ({port}) a megadott URL-ből."
         )
 
+    return ConnectionPool(
+        connection_class=SSLConnection,  # Kötelező az Upstash-hoz (TLS)
+        host=host,
+        port=port,
+        password=UPSTASH_REDIS_TOKEN,
+        ssl_cert_reqs="required",
+        max_connections=REDIS_MAX_CONNECTIONS,
+        health_check_interval=30,
+        socket_keepalive=True,
+    )
+
+
+if not REDIS_URL and (not UPSTASH_REDIS_URL or not UPSTASH_REDIS_TOKEN):
+    print(
+        "!!! Hiba: REDIS_URL, illetve UPSTASH_REDIS_URL vagy UPSTASH_REDIS_TOKEN nincs beállítva. Marad a Flask sütis session-je. !!!"
+    )
+else:
+    try:
+        # Egyetlen redis-py kliens a session-nek és a játékállapotnak is:
+        # a kapcsolatok a készletben maradnak, nincs kérésenkénti HTTPS
+        redis_client = Redis(connection_pool=create_redis_pool())
+
         # =========================================================================
         # REDIS PING TEST AND CONFIG
         # =========================================================================
-        if flask_session_client.ping():
+        if redis_client.ping():
             # Csak sikeres ping esetén állítjuk be a Redis session-t
             app.config["SESSION_TYPE"] = "redis"
-            app.config["SESSION_REDIS"] = flask_session_client
-            app.config["REDIS_CLIENT"] = (
-                upstash_redis_client  # Mentjük a Game State klienst
-            )
+            app.config["SESSION_REDIS"] = redis_client
+            app.config["REDIS_CLIENT"] = redis_client  # Mentjük a Game State klienst
 
             # print(f"!!! Redis ping sikeres: {flask_session_client.ping()} !!!")
         else:
             print(
-                "!!! Redis ping nem sikeres. Marad a Flask-Session alapértelmezett session. !!!"
+                "!!! Redis ping nem sikeres. Marad a Flask sütis session-je. !!!"
             )
 
     except Exception as e:
         # Ha bármelyik inicializálási kísérlet során hiba történik:
         print(f"!!! Kritikus hiba a Redis konfigurálásakor: {e} !!!")
         print(
-            "!!! Visszaállás Flask-Session alapértelmezett session-re a Redis kapcsolat hiba miatt. !!!"
+            "!!! Visszaállás a Flask sütis session-jére a Redis kapcsolat hiba miatt. !!!"
         )
 
 
-# 5. Inicializáljuk a Flask-Session-t
-sess = Session(app)
+# 5. Inicializáljuk a Flask-Session-t (csak Redis mellett)
+sess = Session(app) if app.config.get("SESSION_TYPE") == "redis" else None
 # Ezzel a lépéssel a Flask "session" objektum minden használatakor a Redishez fordul.
 # =========================================================================
 # DATABASE SETUP (NEON POSTGRES)
@@ -130,6 +178,25 @@ db = SQLAlchemy(app)
 log = logging.getLogger("werkzeug")
 log.setLevel(logging.ERROR)
 
+# =========================================================================
+# STRATEGY TABLE (MEMORY-MAPPED)
+# =========================================================================
+app.config["STRATEGY_TABLE"] = None
+
+if os.path.exists(STRATEGY_TABLE_PATH):
+    try:
+        strategy_table = StrategyTable(STRATEGY_TABLE_PATH)
+        # Más szabályokra készült tábla rossz tanácsot adna: ilyenkor nincs "basic"
+        if strategy_table.decks != DECK_COUNT or strategy_table.max_splits != MAX_SPLIT_COUNT:
+            print(
+                f"!!! Figyelem: a stratégia tábla {strategy_table.decks} paklira és {strategy_table.max_splits} splitre készült, nem használjuk. !!!"
+            )
+            strategy_table.close()
+        else:
+            app.config["STRATEGY_TABLE"] = strategy_table
+    except (OSError, ValueError) as e:
+        print(f"!!! Hiba a stratégia tábla betöltésekor: {e} !!!")
+
 
 class User(db.Model):
     __tablename__ = "users"
@@ -140,14 +207,121 @@ class User(db.Model):
     tokens = db.Column(db.Integer, default=1000)
     last_activity = db.Column(
         db.TIMESTAMP(timezone=True),
-        default=datetime.now(timezone.utc),
-        onupdate=datetime.now(timezone.utc),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),  # pl. token változáskor
     )
 
     def __repr__(self):
         return f"<User {self.id[:8]} (Client: {self.client_id[:8]})>"
 
 
+activity_buffer = ActivityBuffer(ACTIVITY_FLUSH_INTERVAL)
+last_token_reconcile = time.monotonic()
+
+
+def bulk_update_users(connection, column_name, changes, only_newer=False):
+    """
+    users.<column_name> beállítása {user_id: érték} alapján egyetlen utasítással.
+    Postgresen UPDATE users ... FROM (VALUES (id, érték), ...), máshol (pl. SQLite
+    fejlesztéshez) executemany. only_newer: csak nagyobb értékkel ír felül.
+    """
+    users = User.__table__
+    target = users.c[column_name]
+    postgres = connection.dialect.name == "postgresql"
+    if postgres:
+        rows = values(
+            column("id", String), column("value", target.type), name="changes"
+        ).data(list(changes.items()))
+        stmt = update(users).where(users.c.id == rows.c.id)
+        value = rows.c.value
+    else:
+        stmt = update(users).where(users.c.id == bindparam("user_id"))
+        value = bindparam("value")
+    if only_newer:
+        stmt = stmt.where(or_(target.is_(None), target < value))
+    # A többi onupdate oszlop (last_activity) marad: a kötegelt írás nem aktivitás
+    unchanged = {
+        c.name: c for c in users.c if c.onupdate is not None and c.name != column_name
+    }
+    stmt = stmt.values({**unchanged, column_name: value})
+
+    if postgres:
+        connection.execute(stmt)
+    else:
+        connection.execute(
+            stmt, [{"user_id": user_id, "value": v} for user_id, v in changes.items()]
+        )
+
+
+def flush_activity(force=False):
+    """
+    A pufferelt last_activity időpontok mentése egyetlen tömeges UPDATE-tel.
+    Csak akkor ír, ha lejárt a mentési időköz (vagy force); korábbi időpontot
+    nem ír felül. Visszatérés: a mentett felhasználók száma.
+    """
+    if not (force or activity_buffer.due()):
+        return 0
+    pending = activity_buffer.drain()
+    if not pending:
+        return 0
+
+    try:
+        # Külön kapcsolaton, hogy a kérés saját tranzakcióját ne érintse
+        with db.engine.begin() as connection:
+            bulk_update_users(connection, "last_activity", pending, only_newer=True)
+    except Exception as e:
+        activity_buffer.restore(pending)
+        print(f"Hiba a last_activity mentésekor: {e}")
+        return 0
+
+    return len(pending)
+
+
+def write_token_balances(balances):
+    with db.engine.begin() as connection:
+        bulk_update_users(connection, "tokens", balances)
+
+
+def reconcile_tokens(force=False):
+    """
+    A Redisben tartott token egyenlegek kiírása a users.tokens oszlopba,
+    kötegenként egy UPDATE-tel. Workerenként TOKEN_RECONCILE_INTERVAL
+    másodpercenként fut (vagy force); egyszerre csak egy worker egyeztet.
+    Visszatérés: a kiírt egyenlegek száma.
+    """
+    global last_token_reconcile
+    if not force and time.monotonic() - last_token_reconcile < TOKEN_RECONCILE_INTERVAL:
+        return 0
+    last_token_reconcile = time.monotonic()
+
+    try:
+        game_store = get_game_store()
+        return game_store.reconcile_balances(write_token_balances) or 0
+    except Exception as e:
+        # A köteg a halmazban marad, a következő egyeztetés megismétli
+        print(f"Hiba a token egyenlegek egyeztetésekor: {e}")
+        return 0
+
+
+def current_tokens(user):
+    """A felhasználó aktuális egyenlege: a tárolóé, ha tartja, különben az adatbázisé."""
+    tokens = get_game_store().balance(user.id)
+    return user.tokens if tokens is None else tokens
+
+
+@atexit.register
+def flush_on_exit():
+    with app.app_context():
+        flush_activity(force=True)
+        reconcile_tokens(force=True)
+
+
+def new_game():
+    return Game(
+        decks=DECK_COUNT, penetration=SHOE_PENETRATION, max_splits=MAX_SPLIT_COUNT
+    )
+
+
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -176,18 +350,114 @@ def login_required(f):
                 401,
             )
 
-        user.last_activity = datetime.now(timezone.utc)
-        db.session.commit()
+        # Írás csak a pufferbe; az adatbázisba időközönként, tömegesen kerül
+        activity_buffer.touch(user.id, datetime.now(timezone.utc))
+        flush_activity()
+        reconcile_tokens()
 
         return f(user=user, *args, **kwargs)
 
     return decorated_function
 
 
+def get_game_store():
+    redis_client = current_app.config.get("REDIS_CLIENT")
+    backend = GAME_STORE_BACKEND or ("redis" if redis_client else "memory")
+
+    # Workerenként egy példány, hogy az L1 cache a kérések között megmaradjon
+    game_store = current_app.config.get("GAME_STORE")
+    if backend == "redis":
+        if not redis_client:
+            raise Exception("Server configuration error: Redis client missing.")
+        if (
+            not isinstance(game_store, RedisGameStore)
+            or game_store.client is not redis_client
+        ):
+            game_store = RedisGameStore(redis_client, GAME_CACHE_SIZE, GAME_STATE_TTL)
+    elif game_store is None:
+        if backend == "memory":
+            game_store = MemoryGameStore(GAME_CACHE_SIZE)
+        elif backend == "file":
+            game_store = FileGameStore(GAME_STORE_PATH, GAME_CACHE_SIZE)
+        else:
+            raise Exception(f"Server configuration error: unknown game store {backend!r}.")
+    current_app.config["GAME_STORE"] = game_store
+
+    return game_store
+
+
+def reap_idle_game_states(
+    idle_days=GAME_STATE_IDLE_DAYS, batch_size=DEFAULT_SCAN_BATCH, pause=0.0
+):
+    """
+    Törli azoknak a felhasználóknak a játékállapotát, akik idle_days napja
+    nem voltak aktívak, vagy már nincsenek az adatbázisban (árva kulcsok).
+    A tároló kötegenként (Redisben SCAN) adja a felhasználókat; kötegenként
+    egy adatbázis lekérdezés és egy törlés fut, köztük pause másodperc szünettel.
+    Visszatérés: {"scanned", "purged", "reclaimed_bytes"}.
+    """
+    flush_activity(force=True)  # a saját worker pufferelt aktivitása is számítson
+    reconcile_tokens(force=True)  # a törölhető egyenlegek már az adatbázisban legyenek
+    game_store = get_game_store()
+    cutoff = datetime.now(timezone.utc) - timedelta(days=idle_days)
+    report = {"scanned": 0, "purged": 0, "reclaimed_bytes": 0}
+
+    for user_ids in game_store.scan_user_ids(batch_size):
+        stmt = select(User.id).where(
+            User.id.in_(user_ids), User.last_activity >= cutoff
+        )
+        active = set(db.session.execute(stmt).scalars())
+        purged, reclaimed = game_store.purge(
+            [user_id for user_id in user_ids if user_id not in active]
+        )
+        report["scanned"] += len(user_ids)
+        report["purged"] += purged
+        report["reclaimed_bytes"] += reclaimed
+        if pause:
+            time.sleep(pause)
+
+    return report
+
+
+@app.cli.command("reap-game-states")
+@click.option("--idle-days", type=float, default=GAME_STATE_IDLE_DAYS)
+@click.option("--batch-size", type=int, default=DEFAULT_SCAN_BATCH)
+@click.option("--pause", type=float, default=0.0, help="szünet kötegenként (mp)")
+def reap_game_states_command(idle_days, batch_size, pause):
+    """Tétlen és árva játékállapotok törlése (pl. cron: flask reap-game-states)."""
+    report = reap_idle_game_states(idle_days, batch_size, pause)
+    click.echo(
+        f"Átnézve: {report['scanned']}, törölve: {report['purged']}, "
+        f"felszabadítva: {report['reclaimed_bytes']:,} bájt"
+    )
+
+
+@app.cli.command("reconcile-tokens")
+def reconcile_tokens_command():
+    """A Redisben tartott token egyenlegek kiírása az adatbázisba (pl. cronból)."""
+    click.echo(f"Kiírt egyenlegek: {reconcile_tokens(force=True)}")
+
+
+def commit_after_game_save():
+    """A token változás véglegesítése a játékállapot sikeres mentése után.
+
+    A @with_game_state alatt futó végpontok ezt hívják db.session.commit()
+    helyett, így ütközéskor a tokenek változása sem kerül be kétszer. Egyenleget
+    tartó tárolónál (Redis) a változás a mentéssel együtt íródik, commit nélkül.
+    """
+    g.commit_pending = True
+
+
 def with_game_state(f):
     """
     Betölti a 'game' állapotát a Redisből, átadja a függvénynek, majd menti.
-    FIGYELEM: Feltételezi, hogy a Game.deserialize() Python szótárat vár.
+    Mentéskor csak a változott hash mezők íródnak vissza (GameStateStore), és csak
+    akkor, ha közben más kérés nem módosította az állapotot. Ütközéskor a
+    művelet friss állapottal újrafut; az adatbázis-módosítás ezután kerül be.
+
+    Ha a tároló tartja a token egyenleget, a user.tokens a tároló egyenlegét
+    mutatja, és a végpont által okozott változás a mentés része (atomikusan,
+    fedezetvizsgálattal); az adatbázisba a reconcile_tokens írja.
     """
 
     @wraps(f)
@@ -201,46 +471,68 @@ def with_game_state(f):
                 "A @with_game_state dekorátort a @login_required után kell használni."
             )
 
-        redis_client = current_app.config.get("REDIS_CLIENT")
-        if not redis_client:
-            raise Exception("Server configuration error: Redis client missing.")
-
-        redis_key = f"game:{user.id}"
-        redis_data_raw = redis_client.get(redis_key)
+        game_store = get_game_store()
+        db_tokens = user.tokens  # kiinduló egyenleg, ha a tároló még nem ismeri
 
-        game = Game()  # Új játék alapértelmezettként
+        for _ in range(GAME_SAVE_RETRIES):
+            g.commit_pending = False
+            game, stored = None, None
 
-        # --- Játékállapot BETÖLTÉSE (LOAD) ---
-        if redis_data_raw:
+            # --- Játékállapot BETÖLTÉSE (LOAD) ---
             try:
-                # EZ AZ A LOGIKA, AMI AZ ÖN FÜGGVÉNYEIBEN IS MŰKÖDÖTT:
-                # 1. Byte/string dekódolása és JSON betöltése Python szótárrá
-                if isinstance(redis_data_raw, bytes):
-                    redis_data_str = redis_data_raw.decode("utf-8")
-                else:
-                    redis_data_str = redis_data_raw
-
-                redis_data = json.loads(redis_data_str)
+                # L1 cache-ből, vagy közvetlenül a tárolt mezőkből
+                game, stored = game_store.load(user.id)
 
-                # 2. Szótár átadása a Game.deserialize-nek
-                game = Game.deserialize(redis_data)
-
-            except Exception as e:
-                # Deszerializációs hiba esetén új játék indítása
+            except DECODE_ERRORS as e:
+                # Csak hibás tárolt állapotnál indul új játék; a tároló I/O
+                # hibája továbbmegy (5xx), különben a mentés felülírná az állapotot
                 print(
                     f"Hiba a Game deszerializálásakor ({user.id}): {e}. Új játék indítása."
                 )
-                game = Game()
 
-        # 1. Eredeti függvény futtatása, átadva a betöltött 'game' objektumot
-        result = f(*args, game=game, **kwargs)
+            if game is None:
+                game = new_game()  # Új játék alapértelmezettként
+
+            if game_store.keeps_balances:
+                tokens = (
+                    game_store.balance(user.id) if stored is None else stored.tokens
+                )
+                start_tokens = db_tokens if tokens is None else tokens
+                # Módosítatlannak jelölve: az ORM nem írja vissza az adatbázisba
+                set_committed_value(user, "tokens", start_tokens)
+
+            # 1. Eredeti függvény futtatása, átadva a betöltött 'game' objektumot
+            result = f(*args, game=game, **kwargs)
 
-        # 2. Játékállapot MENTÉSE (SAVE) a Redisbe
-        # Feltételezzük, hogy a game.serialize() JSON stringet ad vissza.
-        # A set() automatikusan kezeli a string/bytes konverziót.
-        redis_client.set(redis_key, game.serialize())
+            # 2. Játékállapot MENTÉSE (SAVE): verzióellenőrzéssel, egy oda-vissza úttal
+            try:
+                if game_store.keeps_balances:
+                    game_store.save(
+                        user.id, game, stored, user.tokens - start_tokens, db_tokens
+                    )
+                    set_committed_value(user, "tokens", user.tokens)
+                else:
+                    game_store.save(user.id, game, stored)
+            except StateConflict as e:
+                print(f"Párhuzamos módosítás: {e} Újrapróbálás.")
+                db.session.rollback()
+                game_store.forget(user.id)
+                continue
+
+            if g.commit_pending and not game_store.keeps_balances:
+                db.session.commit()
+
+            return result
 
-        return result
+        return (
+            jsonify(
+                {
+                    "error": "ERROR: Game state changed concurrently.",
+                    "game_state_hint": "GAME_STATE_CONFLICT",
+                }
+            ),
+            409,
+        )
 
     return decorated_function
 
@@ -393,22 +685,15 @@ def initialize_session():
     # ----------------------------------------------------------------------
     # 3. REDIS: Játékállapot (Game State) inicializálása vagy betöltése
     # ----------------------------------------------------------------------
-    redis_client = app.config.get("REDIS_CLIENT")
+    game_store = get_game_store()
     game_state_for_client = {}
 
-    if not redis_client:
-        raise Exception("Server configuration error: Redis client missing.")
-
-    redis_key = f"game:{user.id}"
-    redis_data_raw = redis_client.get(redis_key)
-    game_instance = Game()
+    game_instance = new_game()
 
-    if redis_data_raw:
-        redis_client.delete(redis_key)
-        print(f"Régi Redis kulcs ({redis_key}) törölve az új session indításakor.")
+    if game_store.delete(user.id):
+        print(f"Régi Redis állapot ({user.id}) törölve az új session indításakor.")
         try:
             game_instance.clear_up()
-            game_instance.deck_len = game_instance.deck_len_init
         except Exception as e:
             # Hiba esetén új játék indítása
             print(
@@ -416,10 +701,10 @@ def initialize_session():
             )
     else:
         # Nincs játékállás a Redisben: új játék indítása
-        game_instance = Game()
+        game_instance = new_game()
 
     # Elmentjük a Game objektumot a Redisbe
-    redis_client.set(redis_key, game_instance.serialize())
+    game_store.save(user.id, game_instance)
 
     # Szerializáljuk a Kliens számára szükséges publikus adatokat
     game_state_for_client = game_instance.serialize_for_client_init()
@@ -432,7 +717,7 @@ def initialize_session():
             {
                 "status": "success",
                 "message": "User and game session initialized.",
-                "tokens": user.tokens,
+                "tokens": current_tokens(user),
                 "game_state": game_state_for_client,
                 "game_state_hint": "USER_SESSION_INITIALIZED",
             }
@@ -450,7 +735,12 @@ def bet(user, game):
     data = request.get_json()
     bet_amount = data.get("bet", 0)
 
-    if not isinstance(bet_amount, (int, float)) or bet_amount <= 0:
+    # Csak egész tét: a token egyenleg (Redisben is) egész szám
+    if (
+        not isinstance(bet_amount, int)
+        or isinstance(bet_amount, bool)
+        or bet_amount <= 0
+    ):
         return (
             jsonify(
                 {
@@ -484,12 +774,12 @@ def bet(user, game):
         )
 
     user.tokens -= bet_amount
-    db.session.commit()
+    commit_after_game_save()
 
     game.set_bet(bet_amount)
     game.set_bet_list(bet_amount)
     # A game state-et a VÉGÉN a @with_game_state automatikusan menti a Redisbe!
-    # Nincs szükség: db.session.commit() és redis_client.set(redis_key, game.serialize())
+    # Nincs szükség: redis_client.set(...); a token levonás is a mentés után kerül be
 
     game_state_for_client = game.serialize_for_client_bets()
 
@@ -524,7 +814,7 @@ def retake_bet(user, game):
     amount_to_return = game.retake_bet_from_bet_list()
 
     user.tokens += amount_to_return
-    db.session.commit()
+    commit_after_game_save()
 
     game_state_for_client = game.serialize_for_client_bets()
 
@@ -614,7 +904,7 @@ def ins_request(user, game):
         )
     ins = game.insurance_request()
     user.tokens += ins
-    db.session.commit()
+    commit_after_game_save()
 
     game_state_for_client = game.serialize_for_insurance()
 
@@ -662,8 +952,6 @@ def hit(user, game):
 @with_game_state
 @api_error_handler
 def double_request(user, game):
-    user.last_activity = datetime.now(timezone.utc)
-
     bet_amount_to_double = game.get_bet()
 
     if user.tokens < bet_amount_to_double:
@@ -682,7 +970,7 @@ def double_request(user, game):
 
     amount_deducted = game.double_request()
     user.tokens -= amount_deducted
-    db.session.commit()
+    commit_after_game_save()
     game.hit()
 
     game_state_for_client = game.serialize_double_state()
@@ -711,7 +999,7 @@ def rewards(user, game):
     token_change = game.rewards()
 
     user.tokens += token_change
-    db.session.commit()
+    commit_after_game_save()
 
     game_state_for_client = game.serialize_reward_state()
 
@@ -739,7 +1027,7 @@ def stand_and_rewards(user, game):
     token_change = game.rewards()
 
     user.tokens += token_change
-    db.session.commit()
+    commit_after_game_save()
 
     game_state_for_client = game.serialize_reward_state()
 
@@ -764,8 +1052,6 @@ def stand_and_rewards(user, game):
 @with_game_state
 @api_error_handler
 def split_request(user, game):
-    user.last_activity = datetime.now(timezone.utc)
-
     bet_amount = game.get_bet()
 
     if user.tokens < bet_amount:
@@ -783,7 +1069,7 @@ def split_request(user, game):
             ),
             402,
         )
-    if not game.can_split(game.player["hand"]):
+    if not game.can_split(game.player.hand):
         return (
             jsonify(
                 {
@@ -794,7 +1080,7 @@ def split_request(user, game):
             ),
             400,
         )
-    if len(game.players) > 3:
+    if game.split_count >= game.max_splits:
         return (
             jsonify(
                 {
@@ -808,7 +1094,7 @@ def split_request(user, game):
 
     game.split_hand()
     user.tokens -= bet_amount
-    db.session.commit()  # Elmentjük a módosítást az adatbázisba!
+    commit_after_game_save()  # Elmentjük a módosítást az adatbázisba!
 
     game_state_for_client = game.serialize_split_hand()
 
@@ -832,8 +1118,6 @@ def split_request(user, game):
 @with_game_state
 @api_error_handler
 def add_to_players_list_by_stand(user, game):
-    user.last_activity = datetime.now(timezone.utc)
-
     game.add_to_players_list_by_stand()
 
     game_state_for_client = game.serialize_add_to_players_list_by_stand()
@@ -858,9 +1142,7 @@ def add_to_players_list_by_stand(user, game):
 @with_game_state
 @api_error_handler
 def add_split_player_to_game(user, game):
-    user.last_activity = datetime.now(timezone.utc)
-
-    if not game.players:
+    if not game.waiting_count:
         return (
             jsonify(
                 {
@@ -896,9 +1178,7 @@ def add_split_player_to_game(user, game):
 @with_game_state
 @api_error_handler
 def add_player_from_players(user, game):
-    user.last_activity = datetime.now(timezone.utc)
-
-    if not game.players:
+    if not game.waiting_count:
         return (
             jsonify(
                 {
@@ -958,8 +1238,6 @@ def split_hit(user, game):
 @with_game_state
 @api_error_handler
 def split_double_request(user, game):
-    user.last_activity = datetime.now(timezone.utc)
-
     bet_amount_to_double = game.get_bet()
 
     if user.tokens < bet_amount_to_double:
@@ -978,7 +1256,7 @@ def split_double_request(user, game):
 
     amount_deducted = game.double_request()
     user.tokens -= amount_deducted
-    db.session.commit()
+    commit_after_game_save()
     game.hit()
 
     game_state_for_client = game.serialize_split_hand()
@@ -1007,7 +1285,7 @@ def double_stand_and_rewards(user, game):
     token_change = game.rewards()
 
     user.tokens += token_change
-    db.session.commit()
+    commit_after_game_save()
 
     game_state_for_client = game.serialize_split_stand_and_rewards()
 
@@ -1034,7 +1312,7 @@ def set_restart(user, game):
     game.restart_game()
 
     user.tokens = 1000
-    db.session.commit()
+    commit_after_game_save()
 
     game_state_for_client = game.serialize_for_client_bets()
 
@@ -1079,22 +1357,21 @@ def force_restart_by_client_id():
     session["user_id"] = user.id
     session.permanent = True
 
-    redis_client = current_app.config.get("REDIS_CLIENT")
-    redis_key = f"game:{user.id}"
+    game_store = get_game_store()
 
     # A játék egy új, alapértelmezett állapotból indul,
     # mivel a régi játékállapot (pl. a bet) elveszett a sessionnel együtt.
-    game = Game()
+    game = new_game()
     game.restart_game()
 
     # Mentés a Redisbe, felülírva az esetlegesen hibás előző állapotot
-    redis_client.set(redis_key, game.serialize())
+    game_store.save(user.id, game)
 
     return (
         jsonify(
             {
                 "status": "success",
-                "current_tokens": user.tokens,
+                "current_tokens": current_tokens(user),
                 "game_state": game.serialize_for_client_bets(),
                 "game_state_hint": "HIT_RESTART",
             }
@@ -1104,6 +1381,28 @@ def force_restart_by_client_id():
 
 
 # 21
+@app.route("/api/advice", methods=["POST"])
+@login_required
+@with_game_state
+@api_error_handler
+def advice(user, game):
+    # EV-k az aktuális összetételből, a döntés O(1)-ben a stratégia táblából
+    advice_for_client = action_evs(game, current_app.config["STRATEGY_TABLE"])
+
+    return (
+        jsonify(
+            {
+                "status": "success",
+                "current_tokens": user.tokens,
+                "advice": advice_for_client,
+                "game_state_hint": "ADVICE_READY",
+            }
+        ),
+        200,
+    )
+
+
+# 22
 @app.route("/error_page", methods=["GET"])
 def error_page():
     return render_template("error.html")
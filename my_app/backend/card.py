@@ -0,0 +1,45 @@
+SUITS = ("♥", "♦", "♣", "♠")
+RANKS = ("A", "2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K")
+
+ACE = 0  # rank index
+CARDS_PER_DECK = len(SUITS) * len(RANKS)
+HOLE_CARD = -1  # a maszkolt (lefordított) osztói lap helye
+HOLE_LABEL = " ✪ "
+
+# Egy lap kódja: rank_index * 4 + suit_index (0..51).
+# A megjelenítési string csak a kliens felé történő szerializáláskor készül el.
+CARD_LABELS = tuple(f"{SUITS[c & 3]}{RANKS[c >> 2]}" for c in range(CARDS_PER_DECK))
+CARD_VALUES = bytes(min((c >> 2) + 1, 10) for c in range(CARDS_PER_DECK))  # A = 1
+# Hi-Lo számolás: 2-6 = +1, 7-9 = 0, tízesek és ász = -1
+HI_LO_VALUES = tuple(
+    1 if 2 <= CARD_VALUES[c] <= 6 else (0 if 7 <= CARD_VALUES[c] <= 9 else -1)
+    for c in range(CARDS_PER_DECK)
+)
+
+_LABEL_TO_CARD = {label: card for card, label in enumerate(CARD_LABELS)}
+_LABEL_TO_CARD[HOLE_LABEL] = HOLE_CARD
+
+
+def rank_of(card):
+    return card >> 2
+
+
+def is_ace(card):
+    return card >> 2 == ACE
+
+
+def card_label(card):
+    return HOLE_LABEL if card == HOLE_CARD else CARD_LABELS[card]
+
+
+def hand_to_labels(hand):
+    return [HOLE_LABEL if c == HOLE_CARD else CARD_LABELS[c] for c in hand]
+
+
+def to_cards(items):
+    """Kódolt lapokká alakít; a régi, stringes Redis állapotot is elfogadja."""
+    return [_LABEL_TO_CARD[c] if isinstance(c, str) else c for c in items]
+
+
+def new_deck():
+    return list(range(CARDS_PER_DECK))
@@ -0,0 +1,108 @@
+from functools import lru_cache
+
+from my_app.backend.card import CARD_VALUES
+from my_app.backend.hand import BLACKJACK_LIMIT
+
+DEALER_STAND = 17  # Game.stand: az osztó minden 17-en megáll
+CACHE_SIZE = 1 << 16
+
+# Kimenetek sorrendje a visszaadott eloszlásban
+DEALER_TOTALS = (17, 18, 19, 20, 21)
+BUST = len(DEALER_TOTALS)
+BLACKJACK = BUST + 1
+OUTCOMES = BLACKJACK + 1
+
+# Összetétel-kulcs: értékenként (ász = 1 ... tízes = 10) egy 8 bites számláló
+# egyetlen int-be pakolva; egy lap kivétele egy kivonás.
+_BITS = 8
+_MASK = (1 << _BITS) - 1
+_SHIFTS = tuple(_BITS * index for index in range(10))  # érték - 1 szerint
+_UNITS = tuple(1 << shift for shift in _SHIFTS)
+
+
+def composition(cards):
+    """Lapkódokból értékenkénti darabszám (0. index = ász, 9. = tízes)."""
+    counts = [0] * 10
+    for card in cards:
+        counts[CARD_VALUES[card] - 1] += 1
+
+    return counts
+
+
+def pack(counts):
+    key = 0
+    for index, count in enumerate(counts):
+        if not 0 <= count <= _MASK:
+            raise ValueError(f"Card count out of range: {count}.")
+        key |= count << _SHIFTS[index]
+
+    return key
+
+
+def unpack(key):
+    return [(key >> shift) & _MASK for shift in _SHIFTS]
+
+
+def dealer_outcomes(upcard_value, counts):
+    """Az osztó végső kimenetének pontos eloszlása.
+
+    counts: a még nem látott lapok értékenként (a lefordított lap is ide
+    tartozik, a felfordított nem). Visszatérés: OUTCOMES hosszú tuple,
+    17..21, BUST és BLACKJACK (két lapos 21) valószínűségekkel.
+    """
+    if not 1 <= upcard_value <= 10:
+        raise ValueError(f"Upcard value must be between 1 and 10, got {upcard_value}.")
+
+    return _outcomes(pack(counts), sum(counts), upcard_value, upcard_value == 1, True)
+
+
+def expected_outcomes(upcard_value, cards):
+    """dealer_outcomes a maradék lapok kódjaiból (pl. Shoe.cards[cursor:])."""
+    return dealer_outcomes(upcard_value, composition(cards))
+
+
+def cache_info():
+    return _outcomes.cache_info()
+
+
+def cache_clear():
+    _outcomes.cache_clear()
+
+
+def _final_index(total, two_cards):
+    if total > BLACKJACK_LIMIT:
+        return BUST
+    if total == BLACKJACK_LIMIT and two_cards:
+        return BLACKJACK
+    return total - DEALER_STAND
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _outcomes(key, remaining, hard, has_ace, upcard_only):
+    """Eloszlás egy még húzó (17 alatti) osztói kézből.
+
+    A megálló gyerekállapotokat helyben könyveljük el, így a cache csak a
+    belső (húzó) állapotokat tárolja.
+    """
+    result = [0.0] * OUTCOMES
+    if remaining == 0:
+        # Kifogyott összetétel: a vágólap mögötti tartalék miatt gyakorlatilag
+        # nem fordul elő, a valószínűségi tömeg elvész.
+        return tuple(result)
+
+    for value in range(1, 11):
+        count = (key >> _SHIFTS[value - 1]) & _MASK
+        if not count:
+            continue
+        p = count / remaining
+        new_hard = hard + value
+        new_ace = has_ace or value == 1
+        total = new_hard + 10 if new_ace and new_hard + 10 <= BLACKJACK_LIMIT else new_hard
+        if total >= DEALER_STAND:
+            result[_final_index(total, upcard_only)] += p
+            continue
+        sub = _outcomes(key - _UNITS[value - 1], remaining - 1, new_hard, new_ace, False)
+        for index in range(OUTCOMES):
+            result[index] += p * sub[index]
+
+    return tuple(result)
@@ -1,152 +1,110 @@
-import copy
 import math
-import random
 
-from collections import Counter
-from typing import Any, Dict
+from typing import List, NamedTuple
 
+from my_app.backend.action import Action
+from my_app.backend.card import CARD_VALUES, CARDS_PER_DECK, HI_LO_VALUES, to_cards
+from my_app.backend.hand import BLACKJACK_LIMIT, Dealer, Hand, Seat, two_card_info
 from my_app.backend.hand_state import HandState
+from my_app.backend.shoe import DEFAULT_DECKS, DEFAULT_PENETRATION, Shoe
 from my_app.backend.winner_state import WinnerState
 
 NONE = 0
+MAX_SPLITS = 4  # alapértelmezés: ennyi split után a kör már nem bővülhet
+
+# A play_round forró útján az enum tagok elérése drága, ezért előre kötjük őket
+_NO_WINNER = WinnerState.NONE
+_NATURAL_PLAYER = WinnerState.BLACKJACK_PLAYER_WON
+_NATURAL_PUSH = WinnerState.BLACKJACK_PUSH
+_NATURAL_DEALER = WinnerState.BLACKJACK_DEALER_WON
+_STAND = Action.STAND
+_DOUBLE = Action.DOUBLE
+_SPLIT = Action.SPLIT
+
+
+class RoundOutcome(NamedTuple):
+    """Egy fej nélkül lejátszott kör tömör eredménye."""
+
+    net: int  # a játékos nettó nyeresége zsetonban, biztosítással együtt
+    wagered: int  # összes feltett tét (split, duplázás)
+    hands: int
+    dealer_total: int
+    natural_21: int
 
 
 class Game:
-    def __init__(self):
-        self.player: Dict[str, Any] = {
-            "id": NONE,
-            "hand": [],
-            "sum": 0,
-            "hand_state": HandState.NONE,
-            "can_split": False,
-            "stated": False,
-            "bet": 0,
-        }
-        self.dealer_masked: Dict[str, Any] = {
-            "hand": [],
-            "sum": 0,
-            "can_insure": False,
-            "nat_21": WinnerState.NONE,  # Only 1/2/0
-        }
-        self.dealer_unmasked: Dict[str, Any] = {
-            "hand": [],
-            "sum": 0,
-            "hand_state": HandState.NONE,
-            "natural_21": WinnerState.NONE,
-        }
-        self.split_player: Dict[str, Any] = {
-            "id": NONE,
-            "hand": [],
-            "sum": 0,
-            "hand_state": HandState.NONE,
-            "can_split": False,
-            "stated": False,
-            "bet": 0,
-        }
+    def __init__(
+        self,
+        decks=DEFAULT_DECKS,
+        penetration=DEFAULT_PENETRATION,
+        rng=None,
+        max_splits=MAX_SPLITS,
+    ):
+        self.player = Seat(NONE)
+        self.dealer = Dealer()
+        self.activated_id = NONE  # az utoljára aktivált split kéz id-ja (ismétlés elleni bélyeg)
         self.natural_21 = WinnerState.NONE
         self.aces = False
         self.winner = WinnerState.NONE
-        self.hand_counter: int = 0  # helper for the players dict
-        self.players: Dict[str, Dict[str, Any]] = {}
-        self.players_index = {}  # helper for the players dict
+        self.hand_counter: int = 0  # a kezek sorszámozott id-jához
+        # A kör kezei létrehozási (= id) sorrendben; self.player a hands[cursor]
+        self.hands: List[Seat] = []
+        self.cursor: int = 0
+        self.paying = False  # split kezek kifizetése folyik (add_player_from_players)
+        self.max_splits = max_splits
         self.stated = False
-        self.split_req: int = 0
         self.unmasked_sum_sent = False
-        self.suits = ["♥", "♦", "♣", "♠"]
-        self.ranks = ["A", "K", "Q", "J", "2", "3", "4", "5", "6", "7", "8", "9", "10"]
-        self.deck = []
-        self.deck_len_init = 104
+        self.shoe = Shoe(decks, penetration, rng)
         self.bet: int = 0
         self.bet_list = []
         self.is_round_active = False
 
     def initialize_new_round(self):
         self.clear_up()
+        self.shoe.shuffle_if_needed()
 
-        card1 = self.deck.pop(0)
-        card2 = self.deck.pop(0)
-        card3 = self.deck.pop(0)
-        card4 = self.deck.pop(0)
+        draw = self.shoe.draw
+        card1 = draw()
+        card2 = draw()
+        card3 = draw()
+        card4 = draw()
 
-        player_hand = [card1, card3]
-        dealer_hand = [card2, card4]
-        dealer_masked = [" ✪ ", card4]
+        # Egy táblakeresés kezenként: összeg, soft, split és natural egyszerre
+        player_info = two_card_info(card1, card3)
+        dealer_info = two_card_info(card2, card4)
+        player_hand = Hand.from_two(card1, card3, player_info)
+        dealer_hand = Hand.from_two(card2, card4, dealer_info)
 
-        player_sum = self.sum(player_hand, True)
-        dealer_masked_sum = self.sum([card4], False)
-        dealer_unmasked_sum = self.sum(dealer_hand, False)
+        self.natural_21 = self.natural_21_state(player_info.natural, dealer_info.natural)
 
-        self.natural_21 = self.init_natural_21_state(player_hand, dealer_hand)
-        nat_21 = WinnerState.NONE
-        if (
-            self.natural_21 == WinnerState.BLACKJACK_PLAYER_WON
-            or self.natural_21 == WinnerState.BLACKJACK_PUSH
-        ):
-            nat_21 = self.natural_21
-
-        can_split = self.can_split(player_hand)
-        can_insure = card4[-1] == "A"
+        can_split = player_info.splittable
 
-        player_state = (
-            self.hand_state(player_sum, True) if player_sum == 21 else HandState.NONE
+        # Két lapos 21 csak natural lehet
+        player_state = HandState.BLACKJACK if player_info.natural else HandState.NONE
+        dealer_unmasked_state = (
+            HandState.BLACKJACK if dealer_info.natural else HandState.UNDER_21
         )
-        dealer_unmasked_state = self.hand_state(dealer_unmasked_sum, False)
 
         bet = self.get_bet()
         self.is_round_active = True
 
-        self.aces = True if card1[-1] == "A" and card3[-1] == "A" else False
-
-        self.player = {
-            "id": self._generate_sequential_id(),
-            "hand": player_hand,
-            "sum": player_sum,
-            "hand_state": player_state,
-            "can_split": can_split,
-            "stated": self.stated,
-            "bet": bet,
-        }
-        self.dealer_masked: Dict[str, Any] = {
-            "hand": dealer_masked,
-            "sum": dealer_masked_sum,
-            "can_insure": can_insure,
-            "nat_21": nat_21,  # Only 1/2/0
-        }
-        self.dealer_unmasked: Dict[str, Any] = {
-            "hand": dealer_hand,
-            "sum": dealer_unmasked_sum,
-            "hand_state": dealer_unmasked_state,
-            "natural_21": self.natural_21,
-        }
-
-    def sum(self, hand, is_player):
-        ranks = self.hand_to_ranks(hand)
-        counts = Counter(ranks)
-        nums_of_ace = counts["A"]
-        res = 0
-        BLACKJACK_LIMIT = 21
-        for rank in ranks:
-            if rank in ["K", "Q", "J", "0"]:
-                res += 10
-            elif rank.isdigit():
-                res += int(rank)
-        if nums_of_ace > 0:
-            for _ in range(nums_of_ace):
-                if res + 11 <= BLACKJACK_LIMIT:
-                    res += 11
-                else:
-                    res += 1
-        if is_player:
-            self.set_player_sum(res)
-        else:
-            self.set_dealer_sum(res)
+        self.aces = player_info.aces == 2
 
-        return res
+        self.player = Seat(
+            self._generate_sequential_id(),
+            player_hand,
+            player_state,
+            can_split,
+            self.stated,
+            bet,
+        )
+        self.hands = [self.player]
+        self.dealer = Dealer(dealer_hand, dealer_unmasked_state, self.natural_21)
 
     def init_natural_21_state(self, player_hand, dealer_hand):
-        player_natural = self.sum(player_hand, True) == 21 and len(player_hand) == 2
-        dealer_natural = self.sum(dealer_hand, False) == 21 and len(dealer_hand) == 2
+        return self.natural_21_state(player_hand.is_natural, dealer_hand.is_natural)
 
+    def natural_21_state(self, player_natural, dealer_natural):
         if player_natural and dealer_natural:
             self.natural_21 = WinnerState.BLACKJACK_PUSH
         elif player_natural:
@@ -181,8 +139,8 @@ class Game:
         return state
 
     def winner_state(self):
-        player = self.player["sum"]
-        dealer = self.dealer_unmasked["sum"]
+        player = self.player.hand.total
+        dealer = self.dealer.hand.total
 
         if player > 21:
             self.winner = WinnerState.PLAYER_LOST
@@ -204,28 +162,25 @@ class Game:
     def hit(self):
         if not self.is_round_active:
             return
-        new_card = self.deck.pop(0)
+        new_card = self.shoe.draw()
         self.set_player_hand(new_card)
 
-        self.player["sum"] = self.sum(self.player["hand"], True)
-
     def stand(self):
-        count = self.sum(self.dealer_unmasked["hand"], False)
-        if self.sum(self.player["hand"], True) <= 21:
-            while count < 17:
-                card = self.deck.pop(0)
-                self.dealer_unmasked["hand"].append(card)
-                count = self.sum(self.dealer_unmasked["hand"], False)
-                self.dealer_unmasked["sum"] = count
-
-        self.dealer_unmasked["hand_state"] = self.hand_state(count, False)
-        self.player["hand_state"] = self.hand_state(self.player["sum"], True)
+        dealer_hand = self.dealer.hand
+        if self.player.hand.total <= 21:
+            draw = self.shoe.draw
+            while dealer_hand.total < 17:
+                dealer_hand.add(draw())
+        count = dealer_hand.total
+
+        self.dealer.hand_state = self.hand_state(count, False)
+        self.player.hand_state = self.hand_state(self.player.hand.total, True)
         self.winner = NONE
         self.winner = self.winner_state()
 
     def rewards(self) -> int:
-        bet = self.player["bet"]
-        natural_21_scenario = self.dealer_unmasked["natural_21"]
+        bet = self.player.bet
+        natural_21_scenario = self.dealer.natural_21
         reward_amount = 0  # Alapértelmezett érték: 0 (veszteség)
 
         if self.natural_21 == 1:
@@ -254,137 +209,238 @@ class Game:
         bet = self.bet
         ins_cost = math.ceil(self.bet / 2)
 
-        if self.dealer_unmasked["natural_21"] == 3:
+        if self.dealer.natural_21 == 3:
             self.set_bet_to_null()
             self.is_round_active = False
-            self.player["hand_state"] = self.hand_state(self.player["sum"], True)
+            self.player.hand_state = self.hand_state(self.player.hand.total, True)
 
         return bet if self.natural_21 == 3 else -ins_cost
 
     def double_request(self):
-        self.player["bet"] += self.bet
+        self.player.bet += self.bet
 
         return self.bet
 
     def split_hand(self):
-        if not self.can_split(self.player["hand"]) or len(self.players) > 3:
+        if not self.can_split(self.player.hand) or self.split_count >= self.max_splits:
             return
 
-        old_id = self.player["id"]
-        card_to_split = self.player["hand"].pop(0)
-        new_hand1 = [card_to_split]
-        new_hand2 = [self.player["hand"].pop()]
+        old_id = self.player.id
+        card_to_split, second_card = self.player.hand.cards
+        new_hand1 = Hand((card_to_split,))
+        new_hand2 = Hand((second_card,))
 
         new_id_B = self._generate_sequential_id()
         new_hand = self.deal_card(new_hand1, True, hand_id=old_id)
         hand_to_list = self.deal_card(new_hand2, False, hand_id=new_id_B)
 
+        # Az új kéz id-ja a legnagyobb, így a sor végére kerül: a sorrend rendezés nélkül is id szerinti
         self.player = new_hand
-        self.players[hand_to_list["id"]] = hand_to_list
-        old_id = self.player["id"]
-
-        self.players_index[old_id] = self.stated
-        self.players_index[new_id_B] = self.stated
-
-        self.set_split_req(1)
+        self.hands[self.cursor] = new_hand
+        self.hands.append(hand_to_list)
 
     def deal_card(self, hand, is_first, hand_id):
-        if self.deck and is_first:
-            hand.append(self.deck.pop(0))
+        if is_first:
+            hand.add(self.shoe.draw())
 
-        player_sum = self.sum(hand, True)
+        player_sum = hand.total
         can_split = False if self.aces else self.can_split(hand)
         player_state = self.hand_state(player_sum, True) if is_first else HandState.UNDER_21
-        player = {
-            "id": hand_id,
-            "hand": hand,
-            "sum": player_sum,
-            "hand_state": player_state,
-            "can_split": can_split,
-            "stated": self.stated,
-            "bet": self.bet,
-        }
-
-        return player
+        return Seat(hand_id, hand, player_state, can_split, self.stated, self.bet)
 
     def add_to_players_list_by_stand(self):
-        is_active = any(
-            hand_data.get("stated") is False for hand_data in self.players.values()
-        )
+        # Csak akkor áll meg véglegesen, ha van még aktiválásra váró kéz
+        is_active = not self.paying and self.cursor + 1 < len(self.hands)
 
         if is_active:
-            self.player["stated"] = True
-            self.players[self.player["id"]] = self.player
-            ID = self.player["id"]
-            self.players_index[ID] = True
+            self.player.stated = True
 
     def find_smallest_false_stated_id(self):
-        if not self.players_index:
+        # A cursor előtti kezek mind megálltak, utána mind aktiválatlanok
+        if self.paying or len(self.hands) < 2:
             return None
+        if not self.player.stated:
+            return self.player.id
+        if self.cursor + 1 < len(self.hands):
+            return self.hands[self.cursor + 1].id
 
-        unplayed_id_generator = (
-            hand_id
-            for hand_id, is_stated in sorted(self.players_index.items())
-            if is_stated is False
-        )
-        print("335: ", self.players_index)
-        # next() adja vissza a legelső (legkisebb) False állapotú ID-t
-        return next(unplayed_id_generator, None)
+        return None
 
     def add_split_player_to_game(self):
-        if not self.players:
-            return None
-
         hand_id = self.find_smallest_false_stated_id()
 
         if hand_id is None:
             return None
 
-        # ESET 1: VISSZATÖLTÉS (Cache Védelme a Strict Mode miatt)
-        if self.split_player and self.split_player.get("id") == hand_id:
-            self.player = copy.deepcopy(self.split_player)
+        # ESET 1: ISMÉTELT HÍVÁS (Strict Mode): a kéz már aktív, megvan a lapja
+        if self.activated_id == hand_id:
+            return self.player
 
-        # ESET 2: Gyors kiút (A lap már be van töltve)
-        elif self.player and self.player.get("id") == hand_id:
-            pass
+        # ESET 2: ELSŐ FUTÁS (a cursor a következő kézre lép, bélyeg rögzítése)
+        if self.player.id != hand_id:
+            self.cursor += 1
+            self.player = self.hands[self.cursor]
+            self.activated_id = hand_id
 
-        # ESET 3: ELSŐ FUTÁS (Lap kiemelése, mentés, és set_split_req)
-        elif hand_id in self.players:
-            self.player = self.players.pop(hand_id)
-            self.split_player = copy.deepcopy(self.player)
-            self.set_split_req(-1)
-        else:
-            return None
+        hand = self.player.hand
+        if len(hand) < 2:
+            hand.add(self.shoe.draw())
 
-        if len(self.player.get("hand", [])) < 2:
-            if self.deck:
-                card = self.deck.pop(0)
-                self.player["hand"].append(card)
-
-        hand = self.player["hand"]
-        player_sum = self.sum(hand, True)
-        can_split = self.can_split(hand)
-        self.player["sum"] = player_sum
-        self.player["hand_state"] = self.hand_state(player_sum, True)
-        self.player["can_split"] = can_split
+        self.player.hand_state = self.hand_state(hand.total, True)
+        self.player.can_split = self.can_split(hand)
 
         return self.player
 
     def add_player_from_players(self):
-        if not self.players:
+        if not self.paying:
+            if not self.waiting_count:
+                return self.player
+            # Az utoljára játszott kéz már ki van fizetve: kiesik, a többi id szerint jön
+            del self.hands[self.cursor]
+            self.paying = True
+            self.cursor = 0
+        elif self.cursor + 1 < len(self.hands):
+            self.cursor += 1
+        else:
             return self.player
 
-        first_id = list(self.players.keys())[0]
-        self.player = self.players.pop(first_id)
+        self.player = self.hands[self.cursor]
 
         return self.player
 
     def create_deck(self):
-        single_deck = [f"{suit}{rank}" for suit in self.suits for rank in self.ranks]
-        self.deck = single_deck * 2
-        random.shuffle(self.deck)
-
-        return self.deck
+        self.shoe.shuffle()
+
+        return self.shoe
+
+    # headless
+    def play_round(self, policy, bet=None, insure=None):
+        """Egy teljes kör HTTP és szerializálás nélkül.
+
+        policy(hand, upcard_value, can_double, can_split) -> Action minden
+        döntésnél; insure(hand) -> bool ász felfordított lapnál (None: nincs
+        biztosítás). A szabályok a kliens végpont-sorrendjével egyeznek:
+        nincs peek, a split kezek létrehozási sorrendben aktiválódnak,
+        split ászok egy lapot kapnak. A hands/activated_id kliensállapot
+        nem töltődik fel; a kör végén az osztó keze a self.dealer-ben marad.
+        """
+        bet = self.bet if bet is None else bet
+        # A clear_up itt elhagyható: a kör végén minden mező felülíródik
+        self.is_round_active = False
+        if self.hands:
+            self.hands = []
+            self.cursor = 0
+            self.paying = False
+        if self.bet_list:
+            self.set_bet_list_to_null()
+        self.hand_counter = 0
+        self.winner = _NO_WINNER
+        self.unmasked_sum_sent = False
+        shoe = self.shoe
+        shoe.shuffle_if_needed()
+        draw = shoe.draw
+
+        card1 = draw()
+        card2 = draw()
+        card3 = draw()
+        card4 = draw()
+        player_info = two_card_info(card1, card3)
+        dealer_info = two_card_info(card2, card4)
+        player_hand = Hand.from_two(card1, card3, player_info)
+        dealer_hand = Hand.from_two(card2, card4, dealer_info)
+        player_natural = player_info.natural
+        dealer_natural = dealer_info.natural
+        if player_natural:
+            natural_21 = _NATURAL_PUSH if dealer_natural else _NATURAL_PLAYER
+        else:
+            natural_21 = _NATURAL_DEALER if dealer_natural else _NO_WINNER
+        self.natural_21 = natural_21
+        self.aces = split_aces = player_info.aces == 2
+        self.dealer = dealer = Dealer(dealer_hand, HandState.NONE, natural_21)
+        self.player = seat = Seat(NONE, player_hand, bet=bet)
+        upcard = CARD_VALUES[card4]
+
+        if player_natural:
+            net = 0 if dealer_natural else math.floor(bet * 2.5) - bet
+            return RoundOutcome(net, bet, 1, dealer_hand.total, natural_21)
+
+        net = 0
+        if insure is not None and upcard == 1 and insure(player_hand):
+            # Game.insurance_request: osztói BJ-nél +tét és vége, különben -ceil(tét / 2)
+            if dealer_natural:
+                return RoundOutcome(0, bet, 1, dealer_hand.total, natural_21)
+            net -= math.ceil(bet / 2)
+
+        max_hands = self.max_splits + 1
+        hands = [player_hand]
+        stakes = [bet]
+        index = 0
+        while index < len(hands):
+            hand = hands[index]
+            if len(hand.cards) == 1:
+                # Split után aktivált kéz: megkapja a második lapját
+                hand.add(draw())
+                if split_aces:
+                    index += 1
+                    continue
+            while hand.total < BLACKJACK_LIMIT:
+                cards = hand.cards
+                two = len(cards) == 2
+                can_split = (
+                    two
+                    and CARD_VALUES[cards[0]] == CARD_VALUES[cards[1]]
+                    and len(hands) < max_hands
+                    and not (split_aces and len(hands) > 1)
+                )
+                action = policy(hand, upcard, two, can_split)
+                if action == _STAND:
+                    break
+                if action == _DOUBLE and two:
+                    stakes[index] += bet
+                    hand.add(draw())
+                    break
+                if action == _SPLIT and can_split:
+                    second = cards[1]
+                    hand = Hand.from_two(cards[0], draw())
+                    hands[index] = hand
+                    hands.append(Hand((second,)))
+                    stakes.append(bet)
+                    if split_aces:
+                        break
+                    continue
+                hand.add(draw())
+            index += 1
+
+        totals = [hand.total for hand in hands]
+        dealer_total = dealer_hand.total
+        if dealer_total < 17 and min(totals) <= BLACKJACK_LIMIT:
+            while dealer_total < 17:
+                dealer_hand.add(draw())
+                dealer_total = dealer_hand.total
+        if dealer_natural:
+            dealer.hand_state = HandState.BLACKJACK
+        elif dealer_total > BLACKJACK_LIMIT:
+            dealer.hand_state = HandState.BUST
+        else:
+            dealer.hand_state = (
+                HandState.TWENTY_ONE if dealer_total == BLACKJACK_LIMIT else HandState.UNDER_21
+            )
+        if len(hands) > 1:
+            self.player = seat = Seat(NONE, hands[-1])
+        seat.bet = stakes[-1]
+
+        wagered = sum(stakes)
+        reward = 0
+        if not dealer_natural:
+            for total, stake in zip(totals, stakes):
+                if total > BLACKJACK_LIMIT:
+                    continue
+                if dealer_total > BLACKJACK_LIMIT or total > dealer_total:
+                    reward += 2 * stake
+                elif total == dealer_total:
+                    reward += stake
+
+        return RoundOutcome(net + reward - wagered, wagered, len(hands), dealer_total, natural_21)
 
     # helpers
     def _generate_sequential_id(self) -> str:
@@ -393,103 +449,97 @@ class Game:
 
         return f"H-{formatted_count}"
 
-    def sort_key_combined(self, hand):
-        # False (asc) < True (asc)
-        stated_status = hand.get("stated", True)
-        hand_id = hand.get("id", "")
-
-        return (stated_status, hand_id)
-
     def clear_up(self):
-        self.player: Dict[str, Any] = {
-            "id": NONE,
-            "hand": [],
-            "sum": 0,
-            "hand_state": HandState.NONE,
-            "can_split": False,
-            "stated": False,
-            "bet": 0,
-        }
-        self.dealer_masked: Dict[str, Any] = {
-            "hand": [],
-            "sum": 0,
-            "can_insure": False,
-            "nat_21": WinnerState.NONE,
-        }
-        self.dealer_unmasked: Dict[str, Any] = {
-            "hand": [],
-            "sum": 0,
-            "hand_state": HandState.NONE,
-            "natural_21": WinnerState.NONE,
-        }
-        self.split_player: Dict[str, Any] = {
-            "id": NONE,
-            "hand": [],
-            "sum": 0,
-            "hand_state": HandState.NONE,
-            "can_split": False,
-            "stated": False,
-            "bet": 0,
-        }
+        self.player = Seat(NONE)
+        self.dealer = Dealer()
+        self.activated_id = NONE
         self.aces = False
         self.natural_21 = WinnerState.NONE
         self.winner = WinnerState.NONE
         self.hand_counter = 0
-        self.players = {}
-        self.players_index = {}
-        self.split_req = 0
+        self.hands = []
+        self.cursor = 0
+        self.paying = False
         self.unmasked_sum_sent = False
         self.set_bet_list_to_null()
         self.is_round_active = False
 
     def restart_game(self):
-        self.__init__()
-
-    def hand_to_ranks(self, hand):
-        return "".join(c[-1] for c in hand)
+        # A saját keverő (pl. seedelt szimulációs RNG) megmarad
+        self.__init__(
+            self.shoe.decks, self.shoe.penetration, self.shoe.rng, self.max_splits
+        )
 
     def can_split(self, hand):
-        ranks = self.hand_to_ranks(hand)
-        tens = ["K", "Q", "J", "0"]
-        return len(ranks) == 2 and (
-            (ranks[0] == ranks[1]) or (ranks[0] in tens and ranks[1] in tens)
-        )
+        # K, Q, J és 10 egyaránt 10 értékű, így az értékek egyezése elég
+        return len(hand) == 2 and CARD_VALUES[hand[0]] == CARD_VALUES[hand[1]]
 
     def load_state_from_data(self, data):
         self.is_round_active = data.get("is_round_active", False)
 
     # getters, setters
     def set_player_hand(self, card):
-        self.player["hand"].append(card)
-
-    def set_player_sum(self, sum):
-        self.player["sum"] = sum
-
-    def set_dealer_sum(self, sum):
-        self.dealer_masked["sum"] = sum
+        self.player.hand.add(card)
 
     def get_player_state(self):
-        return self.player["hand_state"]
+        return self.player.hand_state
 
     def set_player_state(self, state):
-        self.player["hand_state"] = state
+        self.player.hand_state = state
 
     def get_dealer_state(self):
-        return self.dealer_unmasked["hand_state"]
+        return self.dealer.hand_state
 
     def set_dealer_state(self, state):
-        self.dealer_unmasked["hand_state"] = state
+        self.dealer.hand_state = state
+
+    @property
+    def players(self):
+        """A nem aktív, még ki nem fizetett kezek id sorrendben.
+
+        Játék közben a megállt kéz addig marad itt is, amíg a következő
+        kéz aktiválódik; kifizetéskor a cursor utáni kezek várakoznak.
+        """
+        hands = self.hands
+        cursor = self.cursor
+        if self.paying:
+            return hands[cursor + 1:]
+        if not hands:
+            return []
+        if self.player.stated:
+            return hands[:]
+        return hands[:cursor] + hands[cursor + 1:]
+
+    @property
+    def waiting_count(self):
+        # len(self.players) lista építése nélkül
+        if not self.hands:
+            return 0
+        if self.paying:
+            return len(self.hands) - self.cursor - 1
+        return len(self.hands) - 1 + self.player.stated
+
+    @property
+    def split_count(self):
+        return len(self.hands) - 1 if self.hands and not self.paying else 0
+
+    @property
+    def split_req(self):
+        # A még nem aktivált split kezek száma
+        if self.paying or not self.hands:
+            return 0
+        return len(self.hands) - self.cursor - 1
 
     def get_players(self):
         return self.players
 
     def set_bet(self, amount):
         self.bet += amount
-        self.player["bet"] = self.player["bet"] + amount
+        self.player.bet += amount
 
     def set_bet_to_null(self):
         self.bet = 0
-        self.player["bet"] = 0
+        self.player.bet = 0
 
     def get_bet(self):
         return self.bet
@@ -506,110 +556,136 @@ class Game:
     def get_split_req(self):
         return self.split_req
 
-    def set_split_req(self, count):
-        self.split_req += count
-
     def get_deck_len(self):
-        if len(self.deck) > 0:
-            return len(self.deck)
+        if len(self.shoe) > 0:
+            return len(self.shoe)
         else:
-            return self.deck_len_init
+            return self.shoe.size
+
+    def get_count_state(self):
+        """Hi-Lo számlálás a játékos szemszögéből.
+
+        Amíg az osztó lefordított lapja nincs felfedve, az nem számít bele,
+        és a hátralévő (nem látott) lapok között szerepel.
+        """
+        shoe = self.shoe
+        running_count = shoe.running_count
+        rank_counts = shoe.rank_counts
+        unseen = len(shoe)
+
+        if self.is_round_active and not self.unmasked_sum_sent and self.dealer.hand.cards:
+            hole = self.dealer.hand.cards[0]
+            running_count -= HI_LO_VALUES[hole]
+            rank_counts = rank_counts.copy()
+            rank_counts[hole >> 2] += 1
+            unseen += 1
+
+        true_count = running_count * CARDS_PER_DECK / unseen if unseen else 0.0
+
+        return {
+            "running_count": running_count,
+            "true_count": round(true_count, 2),
+            "rank_counts": rank_counts,
+        }
 
     def get_is_round_active(self):
         return self.is_round_active
 
     def serialize_for_client_init(self):
-        return {"deck_len": self.deck_len_init}
+        return {"deck_len": self.shoe.size}
 
     def serialize_for_client_bets(self):
         return {
             "bet": self.bet,
             "bet_list": self.bet_list,
             "deck_len": self.get_deck_len(),
+            "needs_shuffle": self.shoe.needs_shuffle,
+            "count": self.get_count_state(),
         }
 
     def serialize_initial_and_hit_state(self):
         return {
-            "player": self.player,
-            "dealer_masked": self.dealer_masked,
+            "player": self.player.serialize_for_client(),
+            "dealer_masked": self.dealer.serialize_masked(),
             "deck_len": self.get_deck_len(),
+            "count": self.get_count_state(),
             "bet": self.bet,
             "is_round_active": self.is_round_active,
         }
 
     def serialize_for_insurance(self):
         state = {
-            "player": self.player,
+            "player": self.player.serialize_for_client(),
             "natural_21": self.natural_21,
             "deck_len": self.get_deck_len(),
+            "count": self.get_count_state(),
             "bet": self.bet,
             "is_round_active": self.is_round_active,
         }
 
         if self.natural_21 == 3:
-            state["dealer_unmasked"] = self.dealer_unmasked
+            state["dealer_unmasked"] = self.dealer.serialize_unmasked()
         else:
-            state["dealer_masked"] = self.dealer_masked
+            state["dealer_masked"] = self.dealer.serialize_masked()
 
         return state
 
     def serialize_double_state(self):
         return {
-            "player": self.player,
+            "player": self.player.serialize_for_client(),
             "deck_len": self.get_deck_len(),
+            "count": self.get_count_state(),
             "is_round_active": self.is_round_active,
         }
 
     def serialize_reward_state(self):
         return {
-            "player": self.player,
-            "dealer_unmasked": self.dealer_unmasked,
+            "player": self.player.serialize_for_client(),
+            "dealer_unmasked": self.dealer.serialize_unmasked(),
             "deck_len": self.get_deck_len(),
+            "count": self.get_count_state(),
             "bet": self.bet,
             "winner": self.winner,
             "is_round_active": self.is_round_active,
         }
 
-    @staticmethod
-    def _get_sort_key_combined(hand):
-        return (hand.get("hand_stated", True), hand.get("id", ""))
-
-    def _get_sorted_hands(self):
-        all_hands = list(self.players.values())
-
-        return sorted(all_hands, key=Game._get_sort_key_combined)
+    def _client_hands(self):
+        # A kliens a lapokat megjelenítési stringként kapja (pl. "♥10")
+        return [seat.serialize_for_client() for seat in self.players]
 
     def serialize_split_hand(self):
-        sorted_players_list = self._get_sorted_hands()
+        sorted_players_list = self._client_hands()
 
         return {
-            "player": self.player,
-            "dealer_masked": self.dealer_masked,
+            "player": self.player.serialize_for_client(),
+            "dealer_masked": self.dealer.serialize_masked(),
             "aces": self.aces,
             "players": sorted_players_list,
             "split_req": self.split_req,
             "deck_len": self.get_deck_len(),
+            "count": self.get_count_state(),
             "bet": self.bet,
             "is_round_active": self.is_round_active,
         }
 
     def serialize_add_to_players_list_by_stand(self):
-        sorted_players_list = self._get_sorted_hands()
+        sorted_players_list = self._client_hands()
 
         state = {
-            "player": self.player,
+            "player": self.player.serialize_for_client(),
             "aces": self.aces,
             "players": sorted_players_list,
             "split_req": self.split_req,
             "deck_len": self.get_deck_len(),
+            "count": self.get_count_state(),
             "bet": self.bet,
             "is_round_active": self.is_round_active,
         }
 
         if self.split_req > 0:
-            state["dealer_masked"] = self.dealer_masked
+            state["dealer_masked"] = self.dealer.serialize_masked()
         else:
-            dealer_data_to_serialize = self.dealer_unmasked.copy()
+            dealer_data_to_serialize = self.dealer.serialize_unmasked()
             if not self.unmasked_sum_sent:
                 dealer_data_to_serialize["sum"] = 0
                 self.unmasked_sum_sent = True
@@ -619,49 +695,49 @@ class Game:
         return state
 
     def serialize_add_player_from_players(self):
-        sorted_players_list = self._get_sorted_hands()
+        sorted_players_list = self._client_hands()
 
         return {
-            "player": self.player,
-            "dealer_unmasked": self.dealer_unmasked,
+            "player": self.player.serialize_for_client(),
+            "dealer_unmasked": self.dealer.serialize_unmasked(),
             "aces": self.aces,
             "players": sorted_players_list,
             "split_req": self.split_req,
             "deck_len": self.get_deck_len(),
+            "count": self.get_count_state(),
             "bet": self.bet,
             "is_round_active": self.is_round_active,
         }
 
     def serialize_split_stand_and_rewards(self):
-        sorted_players_list = self._get_sorted_hands()
+        sorted_players_list = self._client_hands()
 
         return {
-            "player": self.player,
-            "dealer_unmasked": self.dealer_unmasked,
+            "player": self.player.serialize_for_client(),
+            "dealer_unmasked": self.dealer.serialize_unmasked(),
             "players": sorted_players_list,
             "winner": self.winner,
             "split_req": self.split_req,
             "deck_len": self.get_deck_len(),
+            "count": self.get_count_state(),
             "bet": self.bet,
             "is_round_active": self.is_round_active,
         }
 
     def serialize(self):
-        sorted_players_list = self._get_sorted_hands()
-
         return {
-            "deck": self.deck,
-            "player": self.player,
-            "dealer_masked": self.dealer_masked,
-            "dealer_unmasked": self.dealer_unmasked,
-            "split_player": self.split_player,
+            "shoe": self.shoe.serialize(),
+            "player": self.player.serialize(),
+            "dealer": self.dealer.serialize(),
+            "activated_id": self.activated_id,
             "aces": self.aces,
             "natural_21": self.natural_21,
             "winner": self.winner,
             "hand_counter": self.hand_counter,
-            "players": sorted_players_list,
-            "players_index": self.players_index,
-            "split_req": self.split_req,
+            "hands": [seat.serialize() for seat in self.hands],
+            "cursor": self.cursor,
+            "paying": self.paying,
+            "max_splits": self.max_splits,
             "unmasked_sum_sent": self.unmasked_sum_sent,
             "deck_len": self.get_deck_len(),
             "bet": self.bet,
@@ -672,21 +748,51 @@ class Game:
     @classmethod
     def deserialize(cls, data):
         game = cls()
-        game.deck = data["deck"]
-        game.player = data["player"]
-        game.dealer_masked = data["dealer_masked"]
-        game.dealer_unmasked = data["dealer_unmasked"]
-        game.split_player = data["split_player"]
+        if "shoe" in data:
+            game.shoe = Shoe.deserialize(data["shoe"])
+        else:
+            game.shoe = Shoe.from_cards(to_cards(data["deck"]))
+        game.player = Seat.deserialize(data["player"])
+        # A régi formátumban az osztó a "dealer_unmasked" kulcs alatt van
+        dealer_data = data.get("dealer") or data["dealer_unmasked"]
+        game.dealer = Dealer.deserialize(dealer_data)
+        if "activated_id" in data:
+            game.activated_id = data["activated_id"]
+        else:
+            game.activated_id = data["split_player"]["id"]
         game.aces = data["aces"]
         game.natural_21 = data["natural_21"]
         game.winner = data["winner"]
         game.hand_counter = data["hand_counter"]
-        game.players = {hand["id"]: hand for hand in data["players"]}
-        game.players_index = data.get("players_index", {})
-        game.split_req = data["split_req"]
+        if "hands" in data:
+            game.hands = [Seat.deserialize(seat_data) for seat_data in data["hands"]]
+            game.cursor = data["cursor"]
+            game.paying = data["paying"]
+            if game.hands:
+                game.player = game.hands[game.cursor]
+        else:
+            game._load_legacy_players(data["players"])
+        game.max_splits = data.get("max_splits", MAX_SPLITS)
         game.unmasked_sum_sent = data["unmasked_sum_sent"]
-        game.deck_len = data["deck_len"]
         game.bet = data["bet"]
         game.bet_list = data["bet_list"]
         game.is_round_active = data.get("is_round_active", False)
         return game
+
+    def _load_legacy_players(self, players_data):
+        # Régi formátum: id szerint rendezett players lista, a player külön
+        player = self.player
+        seats = [Seat.deserialize(seat_data) for seat_data in players_data]
+        # Megállás után a játékos kéz a players listában is szerepelt
+        seats = [seat for seat in seats if seat.id != player.id]
+        if not seats:
+            self.hands = [player] if player.hand else []
+            return
+        if player.stated and all(seat.stated for seat in seats):
+            # Kifizetés közben: a már kifizetett kezek nincsenek a listában
+            self.hands = [player] + seats
+            self.paying = True
+            return
+        index = sum(seat.id < player.id for seat in seats)
+        self.hands = seats[:index] + [player] + seats[index:]
+        self.cursor = index
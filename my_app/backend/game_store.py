@@ -0,0 +1,773 @@
+"""Játékállapot tárolók közös felülettel (GameStateStore).
+
+Három backend:
+    RedisGameStore  éles üzem, több worker / gép közös állapota
+    MemoryGameStore folyamaton belüli dict, egy node-os mód és mérési alap
+    FileGameStore   append-only naplófájl, újraindítás után is megmarad
+
+Mindegyik ugyanazt a hash mezős kódolást (state_codec.encode_fields), a
+változott mezők visszaírását és a verziós compare-and-set mentést használja.
+A tétlen felhasználók állapota a scan_user_ids / purge párossal takarítható
+(lásd app.reap_idle_game_states); Redisben ezen felül lejárati idő (TTL) is
+beállítható, amelyet minden hozzáférés megújít.
+
+A RedisGameStore a felhasználók token egyenlegét is tartja (keeps_balances):
+a tét és a nyeremény a játékállapottal együtt, ugyanabban a compare-and-set
+lépésben változik, az adatbázisba pedig a reconcile_balances kötegenként írja.
+"""
+
+import mmap
+import os
+import struct
+import threading
+import time
+import uuid
+
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional
+
+import msgspec
+
+from my_app.backend import state_codec
+
+try:
+    import fcntl
+except ImportError:  # Windows: nincs flock, a FileGameStore csak egy folyamatból írható
+    fcntl = None
+
+STATE_KEY = "game:state:{}"  # Redis hash, mezőnként a state_codec kódolásával
+VERSION_KEY = "game:ver:{}"  # az állapot verziója, az állapottal együtt törlődik
+VERSION_SEQ_KEY = "game:ver:seq"  # közös sorszám: a verziók sosem ismétlődnek
+LEGACY_KEY = "game:{}"  # régi formátum: a teljes állapot egyetlen string értékben
+BALANCE_KEY = "tokens:{}"  # token egyenleg; csak az adatbázisba írva jár le (TTL)
+DIRTY_KEY = "tokens:dirty"  # az adatbázisba még nem írt egyenlegek felhasználói
+RECONCILING_KEY = "tokens:reconciling"  # a folyamatban lévő egyeztetés felhasználói
+RECONCILE_LOCK_KEY = "tokens:reconcile:lock"
+RECONCILE_LOCK_TTL = 60  # másodperc; ennyi után egy elakadt egyeztetés zárja feloldódik
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_SCAN_BATCH = 500
+NO_VERSION = ""  # még nincs verziószámláló a felhasználóhoz
+ANY_VERSION = "*"  # feltétel nélküli írás (pl. új session)
+
+# Compare-and-set egyetlen oda-vissza úttal, a token egyenleg változásával együtt.
+# KEYS: állapot hash, verzió, régi formátumú kulcs, egyenleg, DIRTY_KEY,
+# VERSION_SEQ_KEY
+# ARGV: várt verzió, teljes írás (1/0), TTL másodpercben (0: nincs),
+# token változás, kezdő egyenleg (ha még nincs a Redisben), felhasználó,
+# majd mező-érték párok
+# Visszatérés: {1, új verzió, egyenleg} siker; {0, tényleges verzió, ''}
+# ütközés, {-1, verzió, egyenleg} ha az egyenleg negatívba menne; nem egész
+# token változásnál hiba, és semmi sem íródik
+_SAVE_SCRIPT = """
+local delta = tonumber(ARGV[4])
+if not delta or delta % 1 ~= 0 then
+    return redis.error_reply('ERR token delta must be an integer')
+end
+local current = redis.call('GET', KEYS[2]) or ''
+if ARGV[1] ~= '*' and current ~= ARGV[1] then
+    return {0, current, ''}
+end
+local balance = redis.call('GET', KEYS[4])
+if delta ~= 0 then
+    balance = tonumber(balance or ARGV[5]) + delta
+    if balance < 0 then
+        return {-1, current, tostring(balance - delta)}
+    end
+    redis.call('SET', KEYS[4], balance)  -- a SET a lejáratot is törli
+    redis.call('SADD', KEYS[5], ARGV[6])
+end
+if #ARGV > 6 then
+    redis.call('HSET', KEYS[1], unpack(ARGV, 7))
+    if ARGV[2] == '1' then
+        redis.call('DEL', KEYS[3])
+    end
+end
+if #ARGV > 6 or delta ~= 0 then
+    current = tostring(redis.call('INCR', KEYS[6]))
+    redis.call('SET', KEYS[2], current)
+end
+local ttl = tonumber(ARGV[3])
+if ttl > 0 then
+    redis.call('EXPIRE', KEYS[1], ttl)
+    redis.call('EXPIRE', KEYS[2], ttl)
+    if redis.call('TTL', KEYS[4]) > 0 then
+        redis.call('EXPIRE', KEYS[4], ttl)
+    end
+end
+return {1, current, balance and tostring(balance) or ''}
+"""
+
+# Felhasználónkénti törlés a felszabadított adatmennyiség mérésével.
+# KEYS: felhasználónként (állapot hash, verzió, régi formátumú kulcs, egyenleg)
+# négyesek, a végén DIRTY_KEY és RECONCILING_KEY
+# ARGV: a felhasználók
+# A verzió kulcs is törlődik: az új verzió a közös sorszámból jön, így más
+# workerek cache-elt példánya sem menthető vissza. Az egyenleg állapot
+# nélkül is törlődik, de csak ha már az adatbázisban van (nem piszkos).
+# Visszatérés: {törölt felhasználók, bájtok}; a bájt a kulcsnevek, mezőnevek
+# és értékek hossza, a Redis saját tárolási többlete nélkül.
+_PURGE_SCRIPT = """
+local dirty, reconciling = KEYS[#KEYS - 1], KEYS[#KEYS]
+local purged, bytes = 0, 0
+for i = 1, #KEYS - 2, 4 do
+    local found = false
+    local fields = redis.call('HGETALL', KEYS[i])
+    if #fields > 0 then
+        found = true
+        bytes = bytes + #KEYS[i]
+        for _, item in ipairs(fields) do
+            bytes = bytes + #item
+        end
+    end
+    local legacy = redis.call('GET', KEYS[i + 2])
+    if legacy then
+        found = true
+        bytes = bytes + #KEYS[i + 2] + #legacy
+    end
+    if found then
+        local version = redis.call('GET', KEYS[i + 1])
+        if version then
+            bytes = bytes + #KEYS[i + 1] + #version
+        end
+        redis.call('DEL', KEYS[i], KEYS[i + 1], KEYS[i + 2])
+    end
+    local user_id = ARGV[(i + 3) / 4]
+    local balance = redis.call('GET', KEYS[i + 3])
+    if balance and redis.call('SISMEMBER', dirty, user_id) == 0
+            and redis.call('SISMEMBER', reconciling, user_id) == 0 then
+        found = true
+        redis.call('DEL', KEYS[i + 3])
+        bytes = bytes + #KEYS[i + 3] + #balance
+    end
+    if found then
+        purged = purged + 1
+    end
+end
+return {purged, bytes}
+"""
+
+# Egyeztetés indítása: zár megszerzése, majd ha nincs félbemaradt köteg,
+# a piszkos halmaz átnevezése. KEYS: zár, DIRTY_KEY, RECONCILING_KEY
+# ARGV: zár azonosító, zár TTL. Visszatérés: -1 ha más egyeztet, különben
+# a feldolgozandó felhasználók száma.
+_RECONCILE_BEGIN_SCRIPT = """
+if not redis.call('SET', KEYS[1], ARGV[1], 'NX', 'EX', ARGV[2]) then
+    return -1
+end
+if redis.call('EXISTS', KEYS[3]) == 0 and redis.call('EXISTS', KEYS[2]) == 1 then
+    redis.call('RENAME', KEYS[2], KEYS[3])
+end
+return redis.call('SCARD', KEYS[3])
+"""
+
+# Egy kiírt köteg lezárása: a felhasználók kivétele a RECONCILING_KEY-ből, és
+# az azóta nem változott egyenlegek lejárata (ttl > 0), mint az állapoté.
+# KEYS: RECONCILING_KEY, DIRTY_KEY, majd az egyenleg kulcsok
+# ARGV: TTL másodpercben (0: nincs), majd a felhasználók
+_RECONCILE_DONE_SCRIPT = """
+local ttl = tonumber(ARGV[1])
+for i = 3, #KEYS do
+    local user_id = ARGV[i - 1]
+    redis.call('SREM', KEYS[1], user_id)
+    if ttl > 0 and redis.call('SISMEMBER', KEYS[2], user_id) == 0 then
+        redis.call('EXPIRE', KEYS[i], ttl)
+    end
+end
+return #KEYS - 2
+"""
+
+# A zár feloldása, ha még a miénk. KEYS: zár; ARGV: zár azonosító
+_RECONCILE_END_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def _text(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class StateConflict(Exception):
+    """Az állapot a betöltés óta megváltozott; a mentés nem történt meg."""
+
+
+class StoredState(NamedTuple):
+    """A betöltött állapot kódolt mezői és verziója; a save ehhez képest ír."""
+
+    fields: Dict[str, str]  # üres: nincs még hash (új vagy régi formátumú állapot)
+    version: str
+    cached: bool = False  # L1 cache-ből jött, a verziót csak a save ellenőrzi
+    tokens: Optional[int] = None  # egyenleg ennél a verziónál; None: nincs a tárolóban
+
+
+class GameStateStore:
+    """A tárolók közös része: mezőnkénti diff, verzióellenőrzés, L1 cache.
+
+    A load a betöltött mezők kódolt alakját is visszaadja; a save ezzel
+    veti össze az új állapotot, és csak az eltérő mezőket írja, változatlan
+    állapotnál pedig semmit. Az írás compare-and-set: csak akkor történik
+    meg, ha a verzió még a betöltéskori; különben StateConflict, és a hívó
+    újrapróbálhatja a teljes műveletet.
+
+    Folyamaton belüli L1 cache: a legutóbb mentett Game objektumok
+    felhasználónként, LRU szerint korlátozva. Találatnál a load nem fordul
+    a backendhez; az elavult példányt a save verzióellenőrzése szűri ki. A
+    load kiveszi az elemet a cache-ből, és csak a sikeres save teszi
+    vissza, így egy félbeszakadt kérés módosított Game-je nem kerülhet vissza.
+    Lejáró állapotnál (TTL) a cache bejegyzés sem él tovább a TTL-nél, mert
+    a lejárt állapotra a cache-elt példány úgysem menthető vissza.
+
+    A backendek a _read, _write, _delete, _scan és _purge metódusokat
+    valósítják meg; a token egyenleget tartó backendnél keeps_balances igaz.
+    """
+
+    keeps_balances = False
+
+    def __init__(self, cache_size=DEFAULT_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # user_id -> (game, StoredState, lejárat)
+        self._cache_max_age = None  # másodperc; None: a bejegyzés nem évül el
+        self._lock = threading.Lock()
+
+    def load(self, user_id):
+        """(game, stored); nincs mentett állapot: (None, stored).
+
+        A régi, string kulcsos állapotot is betölti. Ilyenkor, és új
+        állapotnál is, stored.fields üres, így az első mentés teljes lesz.
+        """
+        with self._lock:
+            cached = self._cache.pop(user_id, None)
+        if cached is not None:
+            game, stored, expires_at = cached
+            if expires_at is None or time.monotonic() < expires_at:
+                return game, stored._replace(cached=True)
+
+        fields, version, legacy, tokens = self._read(user_id)
+        if fields:
+            stored = StoredState(fields, version, tokens=tokens)
+            return state_codec.decode_fields(fields), stored
+
+        stored = StoredState({}, version, tokens=tokens)
+        if legacy:
+            return state_codec.decode(legacy), stored
+
+        return None, stored
+
+    def save(self, user_id, game, stored=None, tokens_delta=0, tokens_seed=None):
+        """A változott mezők mentése; visszatérés: az írt mezők száma.
+
+        stored None: feltétel nélküli, teljes írás. Ha a verzió a betöltés
+        óta megváltozott, StateConflict, és semmi sem íródik.
+        tokens_delta: az egyenleg változása ugyanebben a lépésben (csak
+        keeps_balances esetén); tokens_seed a kiinduló egyenleg, ha a tároló
+        még nem ismeri (az adatbázisból).
+        """
+        if tokens_delta and not self.keeps_balances:
+            raise ValueError(f"{type(self).__name__} does not keep token balances.")
+        if not isinstance(tokens_delta, int) or isinstance(tokens_delta, bool):
+            raise ValueError(f"Token change must be an integer, got {tokens_delta!r}.")
+        fields = state_codec.encode_fields(game)
+        if stored is None:
+            expected, changed = ANY_VERSION, fields
+        else:
+            expected = stored.version
+            changed = {
+                name: value
+                for name, value in fields.items()
+                if stored.fields.get(name) != value
+            }
+            if not changed and not tokens_delta and not stored.cached:
+                # Friss betöltés, változatlan állapot: nincs mit írni
+                self._remember(user_id, game, stored._replace(fields=fields))
+                return 0
+
+        full = not (stored and stored.fields)
+        ok, version, tokens = self._write(
+            user_id, expected, changed, full, tokens_delta, tokens_seed
+        )
+        if not ok:
+            raise StateConflict(
+                f"Game state of user {user_id} changed: expected version "
+                f"{expected!r}, found {version!r}."
+            )
+        self._remember(user_id, game, StoredState(fields, version, tokens=tokens))
+
+        return len(changed)
+
+    def balance(self, user_id):
+        """Az aktuális token egyenleg; None, ha a tároló nem tartja (ilyenkor az adatbázisé)."""
+        return None
+
+    def reconcile_balances(self, write, batch_size=DEFAULT_SCAN_BATCH):
+        """A változott egyenlegek átadása a write({user_id: egyenleg}) hívásnak.
+
+        Visszatérés: az átadott egyenlegek száma; None, ha épp más egyeztet.
+        """
+        return 0
+
+    def delete(self, user_id):
+        """Az állapot törlése; True, ha volt mit törölni.
+
+        A törlés után sem ismétlődhet korábbi verzió, hogy egy másik worker
+        régi cache-elt példánya se az üres, se az újra létrehozott állapotra
+        ne legyen visszamenthető.
+        """
+        self.forget(user_id)
+        return self._delete(user_id)
+
+    def scan_user_ids(self, batch_size=DEFAULT_SCAN_BATCH):
+        """A tárolt állapotok felhasználói, legfeljebb batch_size méretű listákban.
+
+        Futás közbeni módosításnál egy felhasználó kimaradhat vagy kétszer
+        is szerepelhet (mint a Redis SCAN-nél).
+        """
+        return self._scan(batch_size)
+
+    def purge(self, user_ids):
+        """Több felhasználó állapotának törlése: (törölt darab, felszabadított bájt)."""
+        for user_id in user_ids:
+            self.forget(user_id)
+        if not user_ids:
+            return 0, 0
+        return self._purge(user_ids)
+
+    def forget(self, user_id):
+        with self._lock:
+            self._cache.pop(user_id, None)
+
+    def _remember(self, user_id, game, stored):
+        if not self.cache_size:
+            return
+        expires_at = None
+        if self._cache_max_age:
+            expires_at = time.monotonic() + self._cache_max_age
+        with self._lock:
+            self._cache[user_id] = (game, stored, expires_at)
+            self._cache.move_to_end(user_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _read(self, user_id):
+        """(mezők, verzió, régi formátumú érték vagy None, egyenleg vagy None)."""
+        raise NotImplementedError
+
+    def _write(self, user_id, expected, changed, full, tokens_delta, tokens_seed):
+        """Compare-and-set: (True, új verzió, egyenleg) vagy (False, tényleges verzió, None).
+
+        expected ANY_VERSION: feltétel nélkül. Üres changed esetén csak
+        ellenőrzés, a verzió nem nő. full: teljes írás (régi kulcs törölhető).
+        """
+        raise NotImplementedError
+
+    def _delete(self, user_id):
+        """Törlés új verzióval; True, ha volt mit törölni."""
+        return self._purge([user_id])[0] > 0
+
+    def _scan(self, batch_size):
+        raise NotImplementedError
+
+    def _purge(self, user_ids):
+        raise NotImplementedError
+
+
+class RedisGameStore(GameStateStore):
+    """Játékállapot Redis hash-ben (game:state:{id}), verzió a game:ver:{id}-ben.
+
+    A kliens redis-py (vagy azzal kompatibilis, pl. fakeredis) példány. A
+    mentés egy Lua compare-and-set, így L1 cache találatnál a kérés teljes
+    Redis költsége egyetlen oda-vissza út. Minden változó mentés új verziót
+    kap a közös game:ver:seq sorszámból, így a verzió kulcs törlés vagy
+    lejárat után sem adhat ki korábbi értéket.
+
+    ttl (másodperc): az állapot és a verzió kulcs lejárata, amelyet a
+    betöltés és a mentés ugyanabban az oda-vissza útban megújít; None vagy
+    0 esetén a kulcsok nem járnak le. Az egyenleg kulcs csak az adatbázisba
+    írás után kapja meg ugyanezt a lejáratot; ttl nélkül a purge törli.
+
+    Token egyenleg: tokens:{id}, amelyet a mentő script a verzióellenőrzés
+    után, fedezetvizsgálattal növel vagy csökkent, és a felhasználót a
+    tokens:dirty halmazba teszi. Ha a kulcs még nincs meg, a kiinduló érték
+    az adatbázisból jön (tokens_seed). A reconcile_balances a halmazt
+    átnevezi, kötegenként kiírja, és csak a sikeres írás után veszi ki a
+    felhasználókat, így egy félbeszakadt egyeztetést a következő megismétel.
+    """
+
+    keeps_balances = True
+
+    def __init__(self, client, cache_size=DEFAULT_CACHE_SIZE, ttl=None):
+        super().__init__(cache_size)
+        self.client = client
+        self.ttl = ttl or 0
+        self._cache_max_age = ttl or None
+        self._save_script = client.register_script(_SAVE_SCRIPT)
+        self._purge_script = client.register_script(_PURGE_SCRIPT)
+        self._reconcile_begin_script = client.register_script(_RECONCILE_BEGIN_SCRIPT)
+        self._reconcile_done_script = client.register_script(_RECONCILE_DONE_SCRIPT)
+        self._reconcile_end_script = client.register_script(_RECONCILE_END_SCRIPT)
+
+    def balance(self, user_id):
+        tokens = self.client.get(BALANCE_KEY.format(user_id))
+        return None if tokens is None else int(tokens)
+
+    def reconcile_balances(self, write, batch_size=DEFAULT_SCAN_BATCH):
+        lock_id = uuid.uuid4().hex
+        pending = self._reconcile_begin_script(
+            keys=[RECONCILE_LOCK_KEY, DIRTY_KEY, RECONCILING_KEY],
+            args=[lock_id, RECONCILE_LOCK_TTL],
+        )
+        if pending < 0:
+            return None
+
+        written = 0
+        try:
+            while True:
+                user_ids = [
+                    _text(user_id)
+                    for user_id in self.client.srandmember(RECONCILING_KEY, batch_size)
+                ]
+                if not user_ids:
+                    break
+                keys = [BALANCE_KEY.format(user_id) for user_id in user_ids]
+                raw = self.client.mget(keys)
+                balances = {}
+                for user_id, tokens in zip(user_ids, raw):
+                    if tokens is None:
+                        continue
+                    try:
+                        balances[user_id] = int(tokens)
+                    except ValueError:
+                        # Hibás érték: az adatbázisban az utolsó ép egyenleg marad
+                        print(f"Hibás token egyenleg ({user_id}): {tokens!r}, kihagyva.")
+                if balances:
+                    write(balances)
+                    written += len(balances)
+                # Csak a sikeres írás után: hibánál a köteg a következő körben megismétlődik
+                self._reconcile_done_script(
+                    keys=[RECONCILING_KEY, DIRTY_KEY, *keys], args=[self.ttl, *user_ids]
+                )
+        finally:
+            self._reconcile_end_script(keys=[RECONCILE_LOCK_KEY], args=[lock_id])
+
+        return written
+
+    def _read(self, user_id):
+        # Egy tranzakcióban: a verzió biztosan a beolvasott mezőkhöz tartozik
+        pipe = self.client.pipeline(transaction=True)
+        pipe.get(VERSION_KEY.format(user_id))
+        pipe.hgetall(STATE_KEY.format(user_id))
+        pipe.get(LEGACY_KEY.format(user_id))
+        pipe.get(BALANCE_KEY.format(user_id))
+        if self.ttl:
+            pipe.expire(STATE_KEY.format(user_id), self.ttl)
+            pipe.expire(VERSION_KEY.format(user_id), self.ttl)
+            # Az egyenleg lejáratát csak a mentés frissíti: a lejáró egyenleg
+            # már az adatbázisban van, így korábbi lejárat után onnan töltődik
+            # vissza (és nem kell a Redis 7-es EXPIRE XX)
+        version, fields, legacy, tokens = pipe.execute()[:4]
+        fields = {_text(name): _text(value) for name, value in fields.items()}
+        tokens = None if tokens is None else int(tokens)
+
+        return fields, _text(version) or NO_VERSION, legacy, tokens
+
+    def _write(self, user_id, expected, changed, full, tokens_delta, tokens_seed):
+        # Teljes írás után a régi formátumú kulcs már csak elavult másolat
+        args = [
+            expected,
+            1 if full else 0,
+            self.ttl,
+            tokens_delta,
+            0 if tokens_seed is None else tokens_seed,
+            user_id,
+        ]
+        for name, value in changed.items():
+            args.append(name)
+            args.append(value)
+        status, version, tokens = self._save_script(
+            keys=[
+                STATE_KEY.format(user_id),
+                VERSION_KEY.format(user_id),
+                LEGACY_KEY.format(user_id),
+                BALANCE_KEY.format(user_id),
+                DIRTY_KEY,
+                VERSION_SEQ_KEY,
+            ],
+            args=args,
+        )
+        tokens = _text(tokens)
+        if status < 0:
+            # A betöltéskori egyenleg elavult (pl. elveszett kulcs); a hívó újrapróbál
+            raise StateConflict(
+                f"Token balance of user {user_id} is {tokens}, "
+                f"cannot apply {tokens_delta}."
+            )
+
+        return status == 1, _text(version), int(tokens) if tokens else None
+
+    def _scan(self, batch_size):
+        # Egy SCAN lépés találatai egy köteg; a verzió kulcs az állapottal törlődik.
+        # Az egyenleg kulcsok is: ttl nélkül csak a purge törli őket.
+        state_prefix = STATE_KEY.format("")
+        legacy_prefix = LEGACY_KEY.format("")
+        balance_prefix = BALANCE_KEY.format("")
+        balance_sets = {DIRTY_KEY, RECONCILING_KEY, RECONCILE_LOCK_KEY}
+        cursor = 0
+        while True:
+            cursor, keys = self.client.scan(cursor, count=batch_size)
+            user_ids = []
+            for key in keys:
+                key = _text(key)
+                if key.startswith(state_prefix):
+                    user_ids.append(key[len(state_prefix):])
+                elif key.startswith(VERSION_KEY.format("")):
+                    continue
+                elif key.startswith(legacy_prefix):
+                    user_ids.append(key[len(legacy_prefix):])
+                elif key.startswith(balance_prefix) and key not in balance_sets:
+                    user_ids.append(key[len(balance_prefix):])
+            if user_ids:
+                yield list(dict.fromkeys(user_ids))
+            if not cursor:
+                break
+
+    def _purge(self, user_ids):
+        keys = []
+        for user_id in user_ids:
+            keys.append(STATE_KEY.format(user_id))
+            keys.append(VERSION_KEY.format(user_id))
+            keys.append(LEGACY_KEY.format(user_id))
+            keys.append(BALANCE_KEY.format(user_id))
+        keys.append(DIRTY_KEY)
+        keys.append(RECONCILING_KEY)
+        purged, size = self._purge_script(keys=keys, args=user_ids)
+
+        return int(purged), int(size)
+
+
+class MemoryGameStore(GameStateStore):
+    """Játékállapot a folyamat memóriájában; hálózat és lemez nélkül.
+
+    Egy node-os, egy folyamatos futtatáshoz (fejlesztés, mérés): a workerek
+    nem látják egymás állapotát, és újraindításkor az állapot elvész.
+    """
+
+    def __init__(self, cache_size=DEFAULT_CACHE_SIZE):
+        super().__init__(cache_size)
+        self._fields = {}  # user_id -> {mezőnév: kódolt érték}
+        self._versions = {}  # user_id -> int, törléskor is megmarad
+        self._state_lock = threading.Lock()
+
+    def _read(self, user_id):
+        with self._state_lock:
+            return self._snapshot(user_id)
+
+    def _write(self, user_id, expected, changed, full, tokens_delta, tokens_seed):
+        with self._state_lock:
+            return self._compare_and_set(user_id, expected, changed)
+
+    def _scan(self, batch_size):
+        with self._state_lock:
+            user_ids = list(self._fields)
+        for start in range(0, len(user_ids), batch_size):
+            yield user_ids[start:start + batch_size]
+
+    def _purge(self, user_ids):
+        with self._state_lock:
+            purged, size = self._remove(user_ids)
+            return len(purged), size
+
+    def _remove(self, user_ids):
+        """A létező állapotok törlése: (törölt felhasználók, kódolt bájtok)."""
+        purged, size = [], 0
+        for user_id in user_ids:
+            fields = self._fields.pop(user_id, None)
+            if fields is None:
+                continue
+            self._versions[user_id] += 1
+            size += sum(len(name) + len(value) for name, value in fields.items())
+            purged.append(user_id)
+
+        return purged, size
+
+    def _snapshot(self, user_id):
+        version = self._versions.get(user_id)
+        fields = dict(self._fields.get(user_id, ()))
+
+        return fields, NO_VERSION if version is None else str(version), None, None
+
+    def _compare_and_set(self, user_id, expected, changed):
+        version = self._versions.get(user_id)
+        current = NO_VERSION if version is None else str(version)
+        if expected != ANY_VERSION and expected != current:
+            return False, current, None
+        if not changed:
+            return True, current, None
+
+        self._fields.setdefault(user_id, {}).update(changed)
+        self._versions[user_id] = (version or 0) + 1
+
+        return True, str(self._versions[user_id]), None
+
+
+_RECORD_HEADER = struct.Struct("<I")  # a rekord hossza bájtban
+COMPACT_MIN_RECORDS = 10000
+COMPACT_FACTOR = 4  # ennyiszer több rekord, mint élő felhasználó: tömörítés
+
+
+class FileGameStore(MemoryGameStore):
+    """Játékállapot append-only naplófájlban, memóriabeli indexszel.
+
+    Minden változó mentés egy rekord a fájl végén: 4 bájtos hossz, majd
+    msgspec JSON tömb [user_id, verzió, változott mezők] (törlésnél a mezők
+    helyén null). Induláskor és minden művelet előtt a még nem olvasott
+    rekordok mmap-en keresztül kerülnek be az indexbe, így több folyamat
+    (worker) is használhatja ugyanazt a fájlt. Az írás flock alatt történik:
+    felzárkózás, verzióellenőrzés, majd egyetlen os.write a fájl végére.
+
+    Ha a napló sokszorosa az élő állapotnak, az író folyamat új fájlba
+    tömöríti és os.replace-szel cseréli; a többiek az inode változásából
+    veszik észre, és újraolvassák. A fájl végén maradt csonka rekordot
+    (írás közbeni leállás) a következő író levágja.
+    """
+
+    def __init__(self, path, cache_size=DEFAULT_CACHE_SIZE):
+        super().__init__(cache_size)
+        self.path = path
+        self._fd = None
+        self._inode = None
+        self._offset = 0  # eddig beolvasott, ép rekordok vége
+        self._records = 0
+        with self._state_lock:
+            self._catch_up()
+
+    def close(self):
+        with self._state_lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def _read(self, user_id):
+        with self._state_lock:
+            self._catch_up()
+            return self._snapshot(user_id)
+
+    def _write(self, user_id, expected, changed, full, tokens_delta, tokens_seed):
+        with self._state_lock, self._file_lock():
+            ok, version, tokens = self._compare_and_set(user_id, expected, changed)
+            if ok and changed:
+                self._append([user_id, int(version), changed])
+            return ok, version, tokens
+
+    def _scan(self, batch_size):
+        with self._state_lock:
+            self._catch_up()
+        return super()._scan(batch_size)
+
+    def _purge(self, user_ids):
+        # A hely a napló következő tömörítésekor szabadul fel
+        with self._state_lock, self._file_lock():
+            purged, size = self._remove(user_ids)
+            for user_id in purged:
+                self._append([user_id, self._versions[user_id], None])
+            return len(purged), size
+
+    def _open(self):
+        if self._fd is not None:
+            os.close(self._fd)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._inode = os.fstat(self._fd).st_ino
+        self._offset = self._records = 0
+        self._fields.clear()
+        self._versions.clear()
+
+    def _catch_up(self):
+        """A még nem olvasott ép rekordok betöltése az indexbe."""
+        try:
+            replaced = os.stat(self.path).st_ino != self._inode
+        except FileNotFoundError:
+            replaced = True
+        if self._fd is None or replaced:
+            self._open()
+
+        size = os.fstat(self._fd).st_size
+        if size <= self._offset:
+            return
+        with mmap.mmap(self._fd, size, access=mmap.ACCESS_READ) as data:
+            offset = self._offset
+            header = _RECORD_HEADER.size
+            while offset + header <= size:
+                (length,) = _RECORD_HEADER.unpack_from(data, offset)
+                end = offset + header + length
+                if end > size:
+                    break  # csonka rekord: még íródik, vagy leállás miatt maradt
+                user_id, version, fields = msgspec.json.decode(data[offset + header:end])
+                self._apply(user_id, version, fields)
+                offset = end
+        self._offset = offset
+
+    def _apply(self, user_id, version, fields):
+        self._records += 1
+        self._versions[user_id] = version
+        if fields is None:
+            self._fields.pop(user_id, None)
+        else:
+            self._fields.setdefault(user_id, {}).update(fields)
+
+    def _file_lock(self):
+        return _FileLock(self)
+
+    def _append(self, record):
+        payload = msgspec.json.encode(record)
+        os.write(self._fd, _RECORD_HEADER.pack(len(payload)) + payload)
+        self._offset += _RECORD_HEADER.size + len(payload)
+        self._records += 1
+        if self._records > COMPACT_FACTOR * max(len(self._versions), COMPACT_MIN_RECORDS):
+            self._compact()
+
+    def _compact(self):
+        """Az élő állapot új fájlba írása felhasználónként egy rekorddal."""
+        temp_path = f"{self.path}.compact"
+        chunks = []
+        for user_id, version in self._versions.items():
+            payload = msgspec.json.encode([user_id, version, self._fields.get(user_id)])
+            chunks.append(_RECORD_HEADER.pack(len(payload)))
+            chunks.append(payload)
+        with open(temp_path, "wb") as f:
+            f.write(b"".join(chunks))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+
+
+class _FileLock:
+    """Kizárólagos flock a FileGameStore aktuális fájlján, felzárkózással.
+
+    Ha a zár megszerzése közben a fájlt egy másik folyamat tömörítéssel
+    lecserélte, az új fájlon próbálkozik újra.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.fd = None
+
+    def __enter__(self):
+        store = self.store
+        while True:
+            store._catch_up()
+            self.fd = store._fd
+            if fcntl is None:
+                break
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+            if os.stat(store.path).st_ino == store._inode:
+                break
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+        # A zár alatt már minden ép rekord látható; a csonka végét levágjuk
+        store._catch_up()
+        if os.fstat(store._fd).st_size > store._offset:
+            os.truncate(store.path, store._offset)
+
+    def __exit__(self, *exc_info):
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
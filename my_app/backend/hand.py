@@ -0,0 +1,239 @@
+from typing import NamedTuple
+
+from my_app.backend.card import CARD_VALUES, HOLE_CARD, RANKS, hand_to_labels, to_cards
+from my_app.backend.hand_state import HandState
+from my_app.backend.winner_state import WinnerState
+
+BLACKJACK_LIMIT = 21
+
+
+class TwoCard(NamedTuple):
+    """Egy két lapos kéz előre kiszámolt adatai."""
+
+    hard: int
+    aces: int
+    total: int
+    soft: bool
+    splittable: bool
+    natural: bool
+
+
+def _two_card(rank1, rank2):
+    value1 = min(rank1 + 1, 10)
+    value2 = min(rank2 + 1, 10)
+    hard = value1 + value2
+    aces = (value1 == 1) + (value2 == 1)
+    soft = aces > 0 and hard + 10 <= BLACKJACK_LIMIT
+    total = hard + 10 if soft else hard
+
+    return TwoCard(hard, aces, total, soft, value1 == value2, total == BLACKJACK_LIMIT)
+
+
+# Rangpáronként (13 x 13) egy bejegyzés; index: rang1 * len(RANKS) + rang2
+TWO_CARD_TABLE = tuple(
+    _two_card(rank1, rank2) for rank1 in range(len(RANKS)) for rank2 in range(len(RANKS))
+)
+
+
+def two_card_info(first, second):
+    return TWO_CARD_TABLE[(first >> 2) * len(RANKS) + (second >> 2)]
+
+
+class Hand:
+    """Egy kéz lapjai futó összeggel.
+
+    A kemény összeg és az ászok száma lapfelvételkor frissül (O(1)),
+    így az összeg és a soft jelző nem igényel újraszámolást.
+    """
+
+    __slots__ = ("cards", "_hard", "_aces")
+
+    def __init__(self, cards=()):
+        self.cards = []
+        self._hard = 0
+        self._aces = 0
+        for card in cards:
+            self.add(card)
+
+    @classmethod
+    def from_two(cls, first, second, info=None):
+        """Két lapos kéz a TWO_CARD_TABLE alapján, lapankénti összegzés nélkül."""
+        if info is None:
+            info = two_card_info(first, second)
+        hand = cls.__new__(cls)
+        hand.cards = [first, second]
+        hand._hard = info.hard
+        hand._aces = info.aces
+
+        return hand
+
+    def add(self, card):
+        value = CARD_VALUES[card]
+        self.cards.append(card)
+        self._hard += value
+        if value == 1:
+            self._aces += 1
+
+    @property
+    def hard_total(self):
+        return self._hard
+
+    @property
+    def aces(self):
+        return self._aces
+
+    @property
+    def is_soft(self):
+        # Legfeljebb egy ász számolható 11-nek
+        return self._aces > 0 and self._hard + 10 <= BLACKJACK_LIMIT
+
+    @property
+    def total(self):
+        if self._aces and self._hard + 10 <= BLACKJACK_LIMIT:
+            return self._hard + 10
+        return self._hard
+
+    @property
+    def is_natural(self):
+        return len(self.cards) == 2 and self.total == BLACKJACK_LIMIT
+
+    def __len__(self):
+        return len(self.cards)
+
+    def __iter__(self):
+        return iter(self.cards)
+
+    def __getitem__(self, index):
+        return self.cards[index]
+
+    def __repr__(self):
+        return f"Hand({self.cards!r}, total={self.total})"
+
+
+class Seat:
+    """A játékos egy (akár splitelt) keze a hozzá tartozó téttel és állapottal."""
+
+    __slots__ = ("id", "hand", "hand_state", "can_split", "stated", "bet")
+
+    def __init__(
+        self,
+        hand_id=0,
+        hand=None,
+        hand_state=HandState.NONE,
+        can_split=False,
+        stated=False,
+        bet=0,
+    ):
+        self.id = hand_id
+        self.hand = Hand() if hand is None else hand
+        self.hand_state = hand_state
+        self.can_split = can_split
+        self.stated = stated
+        self.bet = bet
+
+    @property
+    def sum(self):
+        return self.hand.total
+
+    def serialize_for_client(self):
+        return {
+            "id": self.id,
+            "hand": hand_to_labels(self.hand.cards),
+            "sum": self.hand.total,
+            "hand_state": self.hand_state,
+            "can_split": self.can_split,
+            "stated": self.stated,
+            "bet": self.bet,
+        }
+
+    def serialize(self):
+        return {
+            "id": self.id,
+            "hand": self.hand.cards,
+            "hand_state": self.hand_state,
+            "can_split": self.can_split,
+            "stated": self.stated,
+            "bet": self.bet,
+        }
+
+    @classmethod
+    def deserialize(cls, data):
+        return cls(
+            data["id"],
+            Hand(to_cards(data["hand"])),
+            data["hand_state"],
+            data["can_split"],
+            data["stated"],
+            data["bet"],
+        )
+
+
+class Dealer:
+    """Az osztó keze; a maszkolt (lefordított lapos) nézet ebből származik."""
+
+    __slots__ = ("hand", "hand_state", "natural_21")
+
+    def __init__(self, hand=None, hand_state=HandState.NONE, natural_21=WinnerState.NONE):
+        self.hand = Hand() if hand is None else hand
+        self.hand_state = hand_state
+        self.natural_21 = natural_21
+
+    @property
+    def sum(self):
+        return self.hand.total
+
+    @property
+    def upcard(self):
+        # Osztási sorrend: a második lap a felfordított
+        return self.hand.cards[1] if len(self.hand.cards) > 1 else None
+
+    @property
+    def can_insure(self):
+        upcard = self.upcard
+        return upcard is not None and CARD_VALUES[upcard] == 1
+
+    def serialize_masked(self):
+        upcard = self.upcard
+        if upcard is None:
+            return {
+                "hand": [],
+                "sum": 0,
+                "can_insure": False,
+                "nat_21": WinnerState.NONE,
+            }
+
+        value = CARD_VALUES[upcard]
+        nat_21 = WinnerState.NONE  # Only 1/2/0
+        if (
+            self.natural_21 == WinnerState.BLACKJACK_PLAYER_WON
+            or self.natural_21 == WinnerState.BLACKJACK_PUSH
+        ):
+            nat_21 = self.natural_21
+
+        return {
+            "hand": hand_to_labels((HOLE_CARD, upcard)),
+            "sum": value + 10 if value == 1 else value,  # egy ász: soft 11
+            "can_insure": self.can_insure,
+            "nat_21": nat_21,
+        }
+
+    def serialize_unmasked(self):
+        return {
+            "hand": hand_to_labels(self.hand.cards),
+            "sum": self.hand.total,
+            "hand_state": self.hand_state,
+            "natural_21": self.natural_21,
+        }
+
+    def serialize(self):
+        return {
+            "hand": self.hand.cards,
+            "hand_state": self.hand_state,
+            "natural_21": self.natural_21,
+        }
+
+    @classmethod
+    def deserialize(cls, data):
+        return cls(
+            Hand(to_cards(data["hand"])), data["hand_state"], data["natural_21"]
+        )
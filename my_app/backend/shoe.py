@@ -0,0 +1,160 @@
+import random
+
+from my_app.backend.card import (
+    CARDS_PER_DECK,
+    HI_LO_VALUES,
+    RANKS,
+    new_deck,
+    rank_of,
+    to_cards,
+)
+
+DEFAULT_DECKS = 2
+MIN_DECKS = 1
+MAX_DECKS = 8
+DEFAULT_PENETRATION = 0.75  # a cipő ennyi része után jön a vágólap
+SEED_BITS = 64
+
+
+class Shoe:
+    """Többpaklis kártyacipő olvasási kurzorral és vágólappal.
+
+    A húzás O(1): a kurzor lép előre, a lista nem tolódik el. A Hi-Lo
+    running count és a rangonként hátralévő lapok száma húzáskor frissül.
+
+    Keveréskor csak egy seed készül; a lapsorrend ebből determinisztikusan,
+    első használatkor áll elő, így a mentett állapot a seed és a kurzor.
+    """
+
+    def __init__(self, decks=DEFAULT_DECKS, penetration=DEFAULT_PENETRATION, rng=None):
+        if not MIN_DECKS <= decks <= MAX_DECKS:
+            raise ValueError(
+                f"Deck count must be between {MIN_DECKS} and {MAX_DECKS}, got {decks}."
+            )
+        if not 0 < penetration <= 1:
+            raise ValueError(f"Penetration must be in (0, 1], got {penetration}.")
+
+        self.decks = decks
+        self.penetration = penetration
+        self.size = decks * CARDS_PER_DECK
+        # A vágólap mögött maradó lapok száma
+        self.reserve = self.size - int(self.size * penetration)
+        self.seed = None  # None: a lapsorrend kívülről érkezett (from_cards)
+        self._cards = []  # None: a seedből még nem generált sorrend
+        self._count = 0
+        self.cursor = 0
+        self.rng = rng or random
+        self.running_count = 0
+        self.rank_counts = [0] * len(RANKS)  # hátralévő lapok rangonként
+
+    @property
+    def cards(self):
+        if self._cards is None:
+            self._cards = self.order_from_seed(self.seed, self.decks)
+        return self._cards
+
+    @cards.setter
+    def cards(self, cards):
+        self.seed = None
+        self._cards = cards
+        self._count = len(cards)
+
+    @staticmethod
+    def order_from_seed(seed, decks):
+        cards = new_deck() * decks
+        random.Random(seed).shuffle(cards)
+
+        return cards
+
+    def __len__(self):
+        return self._count - self.cursor
+
+    @property
+    def needs_shuffle(self):
+        return self._count - self.cursor <= self.reserve
+
+    @property
+    def true_count(self):
+        remaining = self._count - self.cursor
+        if not remaining:
+            return 0.0
+        return self.running_count * CARDS_PER_DECK / remaining
+
+    def recount(self):
+        """Számlálók újraépítése a lapsorrendből (régi állapot betöltésekor)."""
+        cards = self.cards
+        self.running_count = sum(HI_LO_VALUES[card] for card in cards[: self.cursor])
+        self.rank_counts = [0] * len(RANKS)
+        for card in cards[self.cursor :]:
+            self.rank_counts[rank_of(card)] += 1
+
+    def shuffle(self):
+        self.seed = self.rng.getrandbits(SEED_BITS)
+        self._cards = None
+        self._count = self.size
+        self.cursor = 0
+        self.running_count = 0
+        self.rank_counts = [4 * self.decks] * len(RANKS)
+
+    def shuffle_if_needed(self):
+        if self.needs_shuffle:
+            self.shuffle()
+            return True
+        return False
+
+    def draw(self):
+        # Kör közben elfogyott cipő: azonnali újrakeverés
+        if self.cursor >= self._count:
+            self.shuffle()
+        cards = self._cards
+        if cards is None:
+            cards = self.cards
+        card = cards[self.cursor]
+        self.cursor += 1
+        self.running_count += HI_LO_VALUES[card]
+        self.rank_counts[card >> 2] -= 1
+
+        return card
+
+    @classmethod
+    def from_cards(cls, cards, decks=DEFAULT_DECKS, penetration=DEFAULT_PENETRATION):
+        """Előre összeállított (pl. teszt- vagy szimulációs) lapsorrendből épít cipőt."""
+        shoe = cls(decks, penetration)
+        shoe.cards = list(cards)
+        shoe.recount()
+
+        return shoe
+
+    def serialize(self):
+        data = {
+            "decks": self.decks,
+            "penetration": self.penetration,
+            "cursor": self.cursor,
+            "running_count": self.running_count,
+            "rank_counts": self.rank_counts,
+        }
+        # Seedből keverve elég a seed; a kívülről kapott sorrend teljes egészében megy
+        if self.seed is not None:
+            data["seed"] = self.seed
+        else:
+            data["cards"] = self.cards
+
+        return data
+
+    @classmethod
+    def deserialize(cls, data):
+        shoe = cls(data["decks"], data["penetration"])
+        if "seed" in data:
+            shoe.seed = data["seed"]
+            shoe._cards = None
+            shoe._count = shoe.size
+        else:
+            shoe.cards = to_cards(data["cards"])
+        shoe.cursor = data["cursor"]
+        if "rank_counts" in data:
+            shoe.running_count = data["running_count"]
+            shoe.rank_counts = data["rank_counts"]
+        else:
+            shoe.recount()
+
+        return shoe
@@ -0,0 +1,167 @@
+import argparse
+import os
+import random
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from my_app.backend.game import MAX_SPLITS, Game
+from my_app.backend.shoe import DEFAULT_DECKS, DEFAULT_PENETRATION
+from my_app.backend.simulator import (
+    DEFAULT_BATCH,
+    DEFAULT_BET,
+    SimulationResult,
+    always_insure,
+    basic_strategy,
+    simulate,
+    table_policy,
+)
+
+ENGINE_NUMPY = "numpy"
+ENGINE_GAME = "game"
+ENGINES = (ENGINE_NUMPY, ENGINE_GAME)
+
+
+def split_work(n_shoes, workers):
+    """Determinisztikus felosztás: az első n_shoes % workers worker kap eggyel többet."""
+    share, extra = divmod(n_shoes, workers)
+    return [share + (i < extra) for i in range(workers)]
+
+
+def worker_seeds(seed, workers):
+    """Workerenként független, a (seed, workers) párból reprodukálható seed-folyam."""
+    return np.random.SeedSequence(seed).spawn(workers)
+
+
+def _run_numpy(
+    n_shoes, seed_seq, decks, penetration, bet, insurance, batch, max_splits
+):
+    return simulate(
+        n_shoes,
+        decks,
+        penetration,
+        seed_seq,
+        bet=bet,
+        insurance=insurance,
+        batch=batch,
+        max_splits=max_splits,
+    )
+
+
+def _run_game(
+    n_shoes, seed_seq, decks, penetration, bet, insurance, batch, max_splits
+):
+    # A Game saját random.Random példánnyal kever, nem a globális modullal
+    rng = random.Random(int(seed_seq.generate_state(1, dtype=np.uint64)[0]))
+    game = Game(decks, penetration, rng, max_splits)
+    decide = table_policy(basic_strategy())
+    insure = always_insure if insurance else None
+    rounds = net = net_sq = 0
+
+    for _ in range(n_shoes):
+        game.create_deck()
+        while not game.shoe.needs_shuffle:
+            round_net = game.play_round(decide, bet, insure).net
+            rounds += 1
+            net += round_net
+            net_sq += round_net * round_net
+
+    return SimulationResult(rounds, net, net_sq, bet)
+
+
+_ENGINE_RUNNERS = {ENGINE_NUMPY: _run_numpy, ENGINE_GAME: _run_game}
+
+
+def run_parallel(
+    n_shoes,
+    workers=None,
+    seed=None,
+    engine=ENGINE_NUMPY,
+    decks=DEFAULT_DECKS,
+    penetration=DEFAULT_PENETRATION,
+    bet=DEFAULT_BET,
+    insurance=False,
+    batch=DEFAULT_BATCH,
+    max_splits=MAX_SPLITS,
+):
+    """n_shoes cipő szimulálása több folyamaton.
+
+    Azonos seed és workerszám mellett az eredmény bitre azonos: minden
+    worker saját seed-folyamot kap, az összesítés worker-sorrendben történik.
+    """
+    if engine not in _ENGINE_RUNNERS:
+        raise ValueError(f"Unknown engine {engine!r}, expected one of {ENGINES}.")
+    workers = workers or os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError(f"Worker count must be positive, got {workers}.")
+
+    run = _ENGINE_RUNNERS[engine]
+    counts = split_work(n_shoes, workers)
+    seeds = worker_seeds(seed, workers)
+    result = SimulationResult(0, 0, 0, bet)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(
+                run,
+                count,
+                seed_seq,
+                decks,
+                penetration,
+                bet,
+                insurance,
+                batch,
+                max_splits,
+            )
+            for count, seed_seq in zip(counts, seeds)
+        ]
+        # Beküldési sorrendben fésüljük össze, nem befejezési sorrendben
+        for future in futures:
+            result = result.merge(future.result())
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Párhuzamos, seedelt Monte Carlo szimuláció több folyamaton."
+    )
+    parser.add_argument("--shoes", type=int, default=100000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--engine", choices=ENGINES, default=ENGINE_NUMPY)
+    parser.add_argument("--decks", type=int, default=DEFAULT_DECKS)
+    parser.add_argument("--penetration", type=float, default=DEFAULT_PENETRATION)
+    parser.add_argument("--bet", type=int, default=DEFAULT_BET)
+    parser.add_argument("--insurance", action="store_true")
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH)
+    parser.add_argument("--max-splits", type=int, default=MAX_SPLITS)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    result = run_parallel(
+        args.shoes,
+        args.workers,
+        args.seed,
+        args.engine,
+        args.decks,
+        args.penetration,
+        args.bet,
+        args.insurance,
+        args.batch,
+        args.max_splits,
+    )
+    elapsed = time.perf_counter() - started
+    low, high = result.ci95
+
+    print(f"Körök:        {result.rounds}")
+    print(f"EV / kör:     {result.ev:+.5f} tét")
+    print(f"Szórás:       {result.std:.5f} tét")
+    print(f"95% CI:       [{low:+.5f}, {high:+.5f}]")
+    print(f"Sebesség:     {result.rounds / elapsed:,.0f} kör/s")
+
+
+if __name__ == "__main__":
+    main()
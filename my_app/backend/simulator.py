@@ -0,0 +1,642 @@
+import argparse
+import math
+import time
+
+from typing import NamedTuple
+
+import numpy as np
+
+from my_app.backend.action import Action
+from my_app.backend.card import CARD_VALUES, CARDS_PER_DECK
+from my_app.backend.game import MAX_SPLITS, Game
+from my_app.backend.shoe import DEFAULT_DECKS, DEFAULT_PENETRATION, Shoe
+
+# Páros tét, hogy a 3:2 kifizetés (math.floor(bet * 2.5)) pontos legyen
+DEFAULT_BET = 10
+DEFAULT_BATCH = 32768  # egyszerre szimulált cipők száma
+Z_95 = 1.959963984540054
+
+# Stratégia tábla: [összeg 0..21, soft 0/1, kategória, osztó felfordított lapja 1..10]
+MULTI_CARD, TWO_CARD, PAIR = 0, 1, 2
+POLICY_SHAPE = (22, 2, 3, 11)
+# A laposított tábla lépésközei tengelyenként (C-sorrend)
+_POLICY_STRIDES = tuple(int(x) for x in np.cumprod((1,) + POLICY_SHAPE[:0:-1])[::-1])
+
+_VALUES = np.frombuffer(CARD_VALUES, dtype=np.uint8).astype(np.int16)
+
+
+class SimulationResult(NamedTuple):
+    """Összesített eredmény; a tételek egész számok, így az összefésülés pontos."""
+
+    rounds: int
+    net: int  # a játékos nettó nyeresége zsetonban
+    net_sq: int
+    bet: int
+    overflow_rounds: int = 0  # körök, amelyek túlfutottak a cipő végén
+
+    @property
+    def ev(self):
+        """Várható érték egy körre, az alaptét arányában."""
+        return self.net / self.rounds / self.bet if self.rounds else 0.0
+
+    @property
+    def std(self):
+        if self.rounds < 2:
+            return 0.0
+        mean = self.net / self.rounds
+        variance = (self.net_sq - self.rounds * mean * mean) / (self.rounds - 1)
+        return math.sqrt(max(variance, 0.0)) / self.bet
+
+    @property
+    def ci95(self):
+        half = Z_95 * self.std / math.sqrt(self.rounds) if self.rounds else 0.0
+        return (self.ev - half, self.ev + half)
+
+    def merge(self, other):
+        return SimulationResult(
+            self.rounds + other.rounds,
+            self.net + other.net,
+            self.net_sq + other.net_sq,
+            self.bet,
+            self.overflow_rounds + other.overflow_rounds,
+        )
+
+
+def basic_strategy():
+    """Többpaklis, S17 alapstratégia a POLICY_SHAPE elrendezésben."""
+    S, H, D, P = Action.STAND, Action.HIT, Action.DOUBLE, Action.SPLIT
+    table = np.full(POLICY_SHAPE, H, dtype=np.uint8)
+
+    for up in range(1, 11):
+        low = 2 <= up <= 6  # az ász értéke 1
+        for total in range(4, 22):
+            if total >= 17:
+                action = S
+            elif total >= 13:
+                action = S if low else H
+            elif total == 12:
+                action = S if 4 <= up <= 6 else H
+            elif total == 11:
+                action = D if up != 1 else H
+            elif total == 10:
+                action = D if 2 <= up <= 9 else H
+            elif total == 9:
+                action = D if 3 <= up <= 6 else H
+            else:
+                action = H
+            table[total, 0, TWO_CARD, up] = action
+            table[total, 0, MULTI_CARD, up] = H if action == D else action
+
+        for total in range(12, 22):
+            if total >= 19:
+                action = S
+            elif total == 18:
+                action = D if 3 <= up <= 6 else (S if up in (2, 7, 8) else H)
+            elif total == 17:
+                action = D if 3 <= up <= 6 else H
+            elif total >= 15:
+                action = D if 4 <= up <= 6 else H
+            elif total >= 13:
+                action = D if 5 <= up <= 6 else H
+            else:
+                action = H
+            table[total, 1, TWO_CARD, up] = action
+            if action == D:
+                action = S if total == 18 else H
+            table[total, 1, MULTI_CARD, up] = action
+
+    # Párok: ha nem érdemes splitelni, a két lapos sor érvényes
+    table[:, :, PAIR, :] = table[:, :, TWO_CARD, :]
+    for up in range(1, 11):
+        for value in range(1, 11):
+            split = (
+                value in (1, 8)
+                or (value == 9 and up not in (1, 7, 10))
+                or (value in (2, 3, 7) and 2 <= up <= 7)
+                or (value == 6 and 2 <= up <= 6)
+                or (value == 4 and up in (5, 6))
+            )
+            if split:
+                total, soft = (12, 1) if value == 1 else (2 * value, 0)
+                table[total, soft, PAIR, up] = P
+
+    return table
+
+
+def shuffled_shoes(n_shoes, decks=DEFAULT_DECKS, rng=None):
+    """n_shoes db megkevert cipő a Game lapkódolásával (n_shoes × decks*52, int8)."""
+    rng = np.random.default_rng(rng)
+    base = np.tile(np.arange(CARDS_PER_DECK, dtype=np.int8), decks)
+    shoes = np.tile(base, (n_shoes, 1))
+    rng.permuted(shoes, axis=1, out=shoes)
+
+    return shoes
+
+
+def play_shoes(
+    shoes,
+    policy=None,
+    penetration=DEFAULT_PENETRATION,
+    bet=DEFAULT_BET,
+    insurance=False,
+    max_splits=MAX_SPLITS,
+):
+    """Végigjátssza a cipőket a vágólapig, soronként párhuzamosan.
+
+    max_splits: a Game split kerete; a kezek tömbjei ehhez méreteződnek.
+    Visszatérés: (nettó nyereség, körök száma, nettó négyzetösszeg,
+    túlfutott körök) cipőnként.
+    """
+    if max_splits < 0:
+        raise ValueError(f"Split limit must not be negative, got {max_splits}.")
+    if policy is None:
+        policy = basic_strategy()
+    legal = _legal_policy(policy)
+    n, size = shoes.shape
+    reserve = size - int(size * penetration)
+
+    # A sorok végére a saját elejük kerül, így a ritka túlfutás sem indexel ki.
+    values = _VALUES[shoes]
+    flat = np.concatenate([values, values], axis=1).ravel()
+    row_offset = np.arange(n, dtype=np.int64) * (2 * size)
+
+    cursor = np.zeros(n, dtype=np.int64)
+    lane_net = np.zeros(n, dtype=np.int64)
+    lane_rounds = np.zeros(n, dtype=np.int64)
+    lane_sq = np.zeros(n, dtype=np.int64)
+    lane_overflow = np.zeros(n, dtype=np.int64)
+
+    while True:
+        # Game.initialize_new_round: a vágólap után a cipő újrakeverendő
+        idx = np.flatnonzero(size - cursor > reserve)
+        if not idx.size:
+            break
+        pos = row_offset[idx] + cursor[idx]
+        net = _play_round(flat, pos, legal, bet, insurance, max_splits + 1)
+        c = pos - row_offset[idx]
+        cursor[idx] = c
+        lane_net[idx] += net
+        lane_sq[idx] += net * net
+        lane_rounds[idx] += 1
+        lane_overflow[idx] += c > size
+
+    return lane_net, lane_rounds, lane_sq, lane_overflow
+
+
+def _legal_policy(policy):
+    """A policy laposítva; a kategóriában nem lehetséges döntés helyett HIT.
+
+    Többlapos kéznél a DOUBLE és a SPLIT, két lapnál a SPLIT nem lehetséges
+    (a PAIR kategória csak splitelhető kéznél jön szóba), így a játék
+    ciklusában nincs szükség utólagos javításra.
+    """
+    legal = np.array(policy, dtype=np.int8)
+    multi = legal[:, :, MULTI_CARD, :]
+    multi[(multi == Action.DOUBLE) | (multi == Action.SPLIT)] = Action.HIT
+    two = legal[:, :, TWO_CARD, :]
+    two[two == Action.SPLIT] = Action.HIT
+
+    return legal.ravel()
+
+
+def _play_round(flat, pos, policy, bet, insurance, max_hands):
+    # A kezek adatai laposan: a sáv h-adik keze a lane * max_hands + h helyen,
+    # így egy kéz elérése egyetlen egész index (nincs 2D fancy indexelés)
+    m = pos.size
+    total_stride, soft_stride, category_stride, _ = _POLICY_STRIDES
+    stand, hit_, double, split = (
+        int(Action.STAND), int(Action.HIT), int(Action.DOUBLE), int(Action.SPLIT)
+    )
+
+    def draw(lanes):
+        cards = flat[pos[lanes]]
+        pos[lanes] += 1
+        return cards
+
+    p1 = flat[pos]
+    hole = flat[pos + 1]
+    p2 = flat[pos + 2]
+    up = flat[pos + 3]
+    pos += 4
+
+    slots = m * max_hands
+    hard = np.zeros(slots, dtype=np.int16)
+    aces = np.zeros(slots, dtype=np.int16)
+    ncards = np.zeros(slots, dtype=np.int16)
+    first = np.zeros(slots, dtype=np.int16)
+    stake = np.zeros(slots, dtype=np.int64)
+    slot_base = np.arange(m, dtype=np.int64) * max_hands
+    hard[slot_base] = p1 + p2
+    aces[slot_base] = (p1 == 1).astype(np.int16) + (p2 == 1)
+    ncards[slot_base] = 2
+    first[slot_base] = p1
+    stake[slot_base] = bet
+
+    d_hard = hole + up
+    d_aces = (hole == 1).astype(np.int16) + (up == 1)
+    d_total = d_hard + 10 * ((d_aces > 0) & (d_hard <= 11))
+    p_hard = hard[slot_base]
+    p_total = p_hard + 10 * ((aces[slot_base] > 0) & (p_hard <= 11))
+    player_natural = p_total == 21
+    dealer_natural = d_total == 21
+
+    net = np.full(m, -bet, dtype=np.int64)
+    resolved = player_natural.copy()
+    net[player_natural & dealer_natural] += bet
+    net[player_natural & ~dealer_natural] += bet * 5 // 2
+    if insurance:
+        # Game.insurance_request: osztói BJ-nél a tét visszajár, különben ceil(bet / 2)
+        insured = (up == 1) & ~player_natural
+        net[insured & dealer_natural] += bet
+        net[insured & ~dealer_natural] -= (bet + 1) // 2
+        resolved |= insured & dealer_natural
+
+    nh = np.ones(m, dtype=np.int64)
+    cur = np.zeros(m, dtype=np.int64)
+    split_aces = np.zeros(m, dtype=bool)
+    playing = ~resolved
+
+    def advance(lanes):
+        cur[lanes] += 1
+        playing[lanes] = cur[lanes] < nh[lanes]
+
+    while True:
+        ii = np.flatnonzero(playing)
+        if not ii.size:
+            break
+        s = slot_base[ii] + cur[ii]
+        nc = ncards[s]
+
+        # Split után aktivált kéz: megkapja a második lapját
+        need = nc == 1
+        if need.any():
+            jj, sj = ii[need], s[need]
+            card = draw(jj)
+            hard[sj] += card
+            aces[sj] += card == 1
+            ncards[sj] = 2
+            advance(jj[split_aces[jj]])  # split ászok: egy lap után vége
+            keep = ~need
+            ii, s, nc = ii[keep], s[keep], nc[keep]
+
+        hh = hard[s]
+        soft = (aces[s] > 0) & (hh <= 11)
+        total = hh + 10 * soft
+        finished = total >= 21
+        if finished.any():
+            advance(ii[finished])
+            live = ~finished
+            ii, s, nc, hh, soft, total = (
+                ii[live], s[live], nc[live], hh[live], soft[live], total[live]
+            )
+
+        # A kategória: MULTI_CARD (0), TWO_CARD (1), PAIR (2)
+        two = nc == 2
+        can_split = two & (hh == 2 * first[s]) & (nh[ii] < max_hands)
+        category = two.astype(np.int16) + can_split
+        action = policy[
+            total * total_stride
+            + soft * soft_stride
+            + category * category_stride
+            + up[ii]
+        ]
+
+        advance(ii[action == stand])
+
+        hit = action == hit_
+        jj, sj = ii[hit], s[hit]
+        card = draw(jj)
+        hard[sj] += card
+        aces[sj] += card == 1
+        ncards[sj] += 1
+
+        dbl = action == double
+        if dbl.any():
+            jj, sj = ii[dbl], s[dbl]
+            stake[sj] *= 2
+            card = draw(jj)
+            hard[sj] += card
+            aces[sj] += card == 1
+            ncards[sj] += 1
+            advance(jj)
+
+        spl = action == split
+        if spl.any():
+            jj, sj = ii[spl], s[spl]
+            new = slot_base[jj] + nh[jj]
+            value = first[sj]
+            for slot in (sj, new):
+                hard[slot] = value
+                aces[slot] = value == 1
+                ncards[slot] = 1
+                first[slot] = value
+            stake[new] = bet
+            nh[jj] += 1
+            # Game.split_hand: az első kéz azonnal kap egy lapot
+            card = draw(jj)
+            hard[sj] += card
+            aces[sj] += card == 1
+            ncards[sj] = 2
+            is_aces = value == 1
+            split_aces[jj[is_aces]] = True
+            advance(jj[is_aces])
+
+    # Elszámolás: minden sáv első keze laposan, a (ritka) splitelt sávok külön
+    first_hard = hard[slot_base]
+    totals = first_hard + 10 * ((aces[slot_base] > 0) & (first_hard <= 11))
+    alive = totals <= 21
+    any_alive = alive.copy()
+    split_lanes = np.flatnonzero(nh > 1)
+    if split_lanes.size:
+        split_hard = hard.reshape(m, max_hands)[split_lanes]
+        split_ace_counts = aces.reshape(m, max_hands)[split_lanes]
+        split_totals = split_hard + 10 * ((split_ace_counts > 0) & (split_hard <= 11))
+        valid = np.arange(max_hands) < nh[split_lanes, None]
+        split_alive = valid & (split_totals <= 21)
+        any_alive[split_lanes] = split_alive.any(axis=1)
+
+    # Game.stand: az osztó csak akkor húz, ha van nem besokallt kéz
+    jj = np.flatnonzero(~resolved & any_alive & (d_total < 17))
+    while jj.size:
+        card = draw(jj)
+        d_hard[jj] += card
+        d_aces[jj] += card == 1
+        drawn = d_hard[jj]
+        d_total[jj] = drawn = drawn + 10 * ((d_aces[jj] > 0) & (drawn <= 11))
+        jj = jj[drawn < 17]
+
+    first_stake = stake[slot_base]
+    won = alive & ((d_total > 21) | (totals > d_total))
+    push = alive & (totals == d_total)
+    reward = first_stake * (2 * won + push)
+    staked = first_stake
+    if split_lanes.size:
+        dealer = d_total[split_lanes, None]
+        split_stake = stake.reshape(m, max_hands)[split_lanes]
+        won = split_alive & ((dealer > 21) | (split_totals > dealer))
+        push = split_alive & (split_totals == dealer)
+        reward[split_lanes] = (split_stake * (2 * won + push)).sum(axis=1)
+        staked = staked.copy()
+        staked[split_lanes] = split_stake.sum(axis=1)
+    reward[dealer_natural] = 0
+
+    open_lanes = ~resolved
+    net[open_lanes] += bet + reward[open_lanes] - staked[open_lanes]
+
+    return net
+
+
+def simulate(
+    n_shoes,
+    decks=DEFAULT_DECKS,
+    penetration=DEFAULT_PENETRATION,
+    seed=None,
+    policy=None,
+    bet=DEFAULT_BET,
+    insurance=False,
+    batch=DEFAULT_BATCH,
+    max_splits=MAX_SPLITS,
+):
+    """n_shoes cipő szimulálása batch-enként; egy seedből reprodukálható.
+
+    Mért sebesség egy magon, alap batch mellett: kb. 1,2 millió kör/s 2 és 6
+    paklival, a keveréssel együtt (maga a lejátszás kb. 1,6 millió kör/s, a
+    futásidő negyede a rng.permuted keverés). A "több millió kör/s magonként"
+    célt így nem éri el; nagyobb átfutáshoz a sim_runner több magot használ.
+    """
+    rng = np.random.default_rng(seed)
+    if policy is None:
+        policy = basic_strategy()
+    result = SimulationResult(0, 0, 0, bet)
+
+    for start in range(0, n_shoes, batch):
+        shoes = shuffled_shoes(min(batch, n_shoes - start), decks, rng)
+        net, rounds, net_sq, overflow = play_shoes(
+            shoes, policy, penetration, bet, insurance, max_splits
+        )
+        result = result.merge(
+            SimulationResult(
+                int(rounds.sum()),
+                int(net.sum()),
+                int(net_sq.sum()),
+                bet,
+                int(overflow.sum()),
+            )
+        )
+
+    return result
+
+
+def play_shoes_with_game(
+    shoes,
+    policy=None,
+    penetration=DEFAULT_PENETRATION,
+    bet=DEFAULT_BET,
+    insurance=False,
+    max_splits=MAX_SPLITS,
+):
+    """Ugyanazokat a cipőket a Game motorral játssza le, a kliens hívássorrendjében.
+
+    A vektorizált szimuláció ellenőrzésére szolgál: túlfutás nélküli
+    cipőkön a cipőnkénti nettó eredménynek egyeznie kell.
+    """
+    if policy is None:
+        policy = basic_strategy()
+    n, size = shoes.shape
+    decks = size // CARDS_PER_DECK
+    lane_net = np.zeros(n, dtype=np.int64)
+    lane_rounds = np.zeros(n, dtype=np.int64)
+
+    for lane in range(n):
+        game = Game(decks, penetration, max_splits=max_splits)
+        game.shoe = Shoe.from_cards(shoes[lane].tolist(), decks, penetration)
+        while not game.shoe.needs_shuffle:
+            lane_net[lane] += play_game_round(game, policy, bet, insurance)
+            lane_rounds[lane] += 1
+
+    return lane_net, lane_rounds
+
+
+def play_shoes_headless(
+    shoes,
+    policy=None,
+    penetration=DEFAULT_PENETRATION,
+    bet=DEFAULT_BET,
+    insurance=False,
+    max_splits=MAX_SPLITS,
+):
+    """Ugyanazok a cipők a Game.play_round fej nélküli útvonalán."""
+    if policy is None:
+        policy = basic_strategy()
+    decide = table_policy(policy)
+    insure = always_insure if insurance else None
+    n, size = shoes.shape
+    decks = size // CARDS_PER_DECK
+    lane_net = np.zeros(n, dtype=np.int64)
+    lane_rounds = np.zeros(n, dtype=np.int64)
+
+    for lane in range(n):
+        game = Game(decks, penetration, max_splits=max_splits)
+        game.shoe = Shoe.from_cards(shoes[lane].tolist(), decks, penetration)
+        net = rounds = 0
+        while not game.shoe.needs_shuffle:
+            net += game.play_round(decide, bet, insure).net
+            rounds += 1
+        lane_net[lane] = net
+        lane_rounds[lane] = rounds
+
+    return lane_net, lane_rounds
+
+
+def table_policy(policy):
+    """POLICY_SHAPE tábla Game.play_round döntési callbackként."""
+    table = policy.tolist()  # listás indexelés: nincs numpy skalár per döntés
+
+    def decide(hand, upcard, can_double, can_split):
+        category = PAIR if can_split else (TWO_CARD if can_double else MULTI_CARD)
+        return table[hand.total][hand.is_soft][category][upcard]
+
+    return decide
+
+
+def always_insure(hand):
+    return True
+
+
+def _policy_action(game, policy):
+    seat = game.player
+    hand = seat.hand
+    two = len(hand) == 2
+    can_split = two and seat.can_split and game.split_count < game.max_splits
+    category = PAIR if can_split else (TWO_CARD if two else MULTI_CARD)
+    upcard = CARD_VALUES[game.dealer.upcard]
+    action = policy[hand.total, int(hand.is_soft), category, upcard]
+    if action == Action.DOUBLE and not two:
+        return Action.HIT
+    if action == Action.SPLIT and not can_split:
+        return Action.HIT
+
+    return Action(action)
+
+
+def play_game_round(game, policy, bet, insurance):
+    game.set_bet(bet)
+    game.set_bet_list(bet)
+    net = -bet
+    game.initialize_new_round()
+
+    if game.natural_21 in (1, 2):
+        return net + game.rewards()
+
+    if insurance and game.dealer.can_insure:
+        net += game.insurance_request()
+        if not game.is_round_active:
+            return net
+
+    split = False
+    while True:
+        if not (split and game.aces):
+            while game.player.sum < 21:
+                action = _policy_action(game, policy)
+                if action == Action.STAND:
+                    break
+                if action == Action.HIT:
+                    game.hit()
+                elif action == Action.DOUBLE:
+                    net -= game.double_request()
+                    game.hit()
+                    break
+                else:
+                    net -= game.get_bet()
+                    game.split_hand()
+                    split = True
+                    if game.aces:
+                        break
+        if not split:
+            break
+        game.add_to_players_list_by_stand()
+        if game.split_req > 0:
+            game.add_split_player_to_game()
+        else:
+            break
+
+    while True:
+        game.stand()
+        net += game.rewards()
+        if not game.waiting_count:
+            return net
+        game.add_player_from_players()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Vektorizált Monte Carlo szimuláció a Game szabályaival."
+    )
+    parser.add_argument("--shoes", type=int, default=20000)
+    parser.add_argument("--decks", type=int, default=DEFAULT_DECKS)
+    parser.add_argument("--penetration", type=float, default=DEFAULT_PENETRATION)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--bet", type=int, default=DEFAULT_BET)
+    parser.add_argument("--insurance", action="store_true")
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH)
+    parser.add_argument("--max-splits", type=int, default=MAX_SPLITS)
+    parser.add_argument(
+        "--verify",
+        type=int,
+        default=0,
+        help="ennyi cipőt a Game motorral is lejátszik és összevet",
+    )
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    result = simulate(
+        args.shoes,
+        args.decks,
+        args.penetration,
+        args.seed,
+        bet=args.bet,
+        insurance=args.insurance,
+        batch=args.batch,
+        max_splits=args.max_splits,
+    )
+    elapsed = time.perf_counter() - started
+    low, high = result.ci95
+
+    print(f"Körök:        {result.rounds}")
+    print(f"EV / kör:     {result.ev:+.5f} tét")
+    print(f"Szórás:       {result.std:.5f} tét")
+    print(f"95% CI:       [{low:+.5f}, {high:+.5f}]")
+    print(f"Sebesség:     {result.rounds / elapsed:,.0f} kör/s")
+    if result.overflow_rounds:
+        print(f"Túlfutás:     {result.overflow_rounds} kör")
+
+    if args.verify:
+        shoes = shuffled_shoes(args.verify, args.decks, args.seed)
+        policy = basic_strategy()
+        sim_net, sim_rounds, _, overflow = play_shoes(
+            shoes, policy, args.penetration, args.bet, args.insurance, args.max_splits
+        )
+        game_net, game_rounds = play_shoes_with_game(
+            shoes, policy, args.penetration, args.bet, args.insurance, args.max_splits
+        )
+        headless_net, headless_rounds = play_shoes_headless(
+            shoes, policy, args.penetration, args.bet, args.insurance, args.max_splits
+        )
+        checked = overflow == 0
+        mismatched = int(
+            (
+                (sim_net != game_net)
+                | (sim_rounds != game_rounds)
+                | (headless_net != game_net)
+                | (headless_rounds != game_rounds)
+            )[checked].sum()
+        )
+        print(
+            f"Ellenőrzés:   {int(checked.sum())} cipő, {mismatched} eltérés a Game-hez képest"
+        )
+        if mismatched:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""A Redisben tárolt játékállapot típusos, verziózott kódolása (msgspec).
+
+Az állapot tömör JSON tömbként megy ki: a mezőnevek helyett pozíciók, az
+első elem a séma verziója. JSON és nem MessagePack: a hash mezőnkénti
+értékei így szövegek, amelyeket a FileGameStore naplója (msgspec JSON)
+változatlanul tárol, és redis-cli-ből is olvashatók. A dekóder közvetlenül
+a Game objektumot építi fel, köztes szótár és alapértelmezett Game nélkül;
+a régi, szótáras JSON formátumot a Game.deserialize olvassa tovább.
+
+Redis hash-hez ugyanez mezőnként is elérhető (encode_fields/decode_fields),
+így csak a ténylegesen változott mezőket kell visszaírni.
+"""
+
+import json
+
+from typing import Dict, List, Optional, Union
+
+import msgspec
+
+from my_app.backend.game import Game
+from my_app.backend.hand import Dealer, Hand, Seat
+from my_app.backend.shoe import Shoe
+
+
+class SeatState(msgspec.Struct, array_like=True):
+    id: Union[int, str]  # NONE (0) az osztás előtt, egyébként "H-001" alakú
+    hand: List[int]
+    hand_state: int
+    can_split: bool
+    stated: bool
+    bet: int
+
+
+class DealerState(msgspec.Struct, array_like=True):
+    hand: List[int]
+    hand_state: int
+    natural_21: int
+
+
+class ShoeState(msgspec.Struct, array_like=True):
+    decks: int
+    penetration: float
+    cursor: int
+    running_count: int
+    rank_counts: List[int]
+    seed: Optional[int] = None  # seedből kevert cipő
+    cards: Optional[List[int]] = None  # kívülről kapott lapsorrend (from_cards)
+
+
+class GameStateV1(msgspec.Struct, array_like=True, tag=1):
+    shoe: ShoeState
+    player: Optional[SeatState]  # csak ha nincs kéz a hands listában (osztás előtt)
+    dealer: DealerState
+    hands: List[SeatState]  # az aktív kéz a hands[cursor]
+    cursor: int
+    paying: bool
+    max_splits: int
+    activated_id: Union[int, str]
+    aces: bool
+    natural_21: int
+    winner: int
+    hand_counter: int
+    unmasked_sum_sent: bool
+    bet: int
+    bet_list: List[int]
+    is_round_active: bool
+
+
+# Új sémaverzió: új Struct a következő taggel, és felvétel ebbe az unióba
+# és a _SCHEMAS táblába
+GameState = Union[GameStateV1]
+SCHEMA_VERSION = 1
+VERSION_FIELD = "v"  # a hash sémaverzió mezője
+
+_SCHEMAS = {1: GameStateV1}
+# Hibás tárolt állapot: msgspec hiba (a ValidationError is ilyen), hiányzó
+# mező vagy ismeretlen verzió, illetve a régi formátum JSON/kulcs hibája
+DECODE_ERRORS = (msgspec.DecodeError, ValueError, KeyError)
+_encoder = msgspec.json.Encoder()
+_decoder = msgspec.json.Decoder(GameState)
+# Hash mezőnkénti dekóderek: {verzió: {mezőnév: Decoder}}
+_FIELD_DECODERS = {
+    version: {
+        field.name: msgspec.json.Decoder(field.type)
+        for field in msgspec.structs.fields(schema)
+    }
+    for version, schema in _SCHEMAS.items()
+}
+
+
+def _seat_state(seat):
+    return SeatState(
+        seat.id, seat.hand.cards, seat.hand_state, seat.can_split, seat.stated, seat.bet
+    )
+
+
+def _shoe_state(shoe):
+    if shoe.seed is not None:
+        return ShoeState(
+            shoe.decks,
+            shoe.penetration,
+            shoe.cursor,
+            shoe.running_count,
+            shoe.rank_counts,
+            seed=shoe.seed,
+        )
+    return ShoeState(
+        shoe.decks,
+        shoe.penetration,
+        shoe.cursor,
+        shoe.running_count,
+        shoe.rank_counts,
+        cards=shoe.cards,
+    )
+
+
+def _state(game):
+    hands = game.hands
+    dealer = game.dealer
+    return GameStateV1(
+        _shoe_state(game.shoe),
+        None if hands else _seat_state(game.player),
+        DealerState(dealer.hand.cards, dealer.hand_state, dealer.natural_21),
+        [_seat_state(seat) for seat in hands],
+        game.cursor,
+        game.paying,
+        game.max_splits,
+        game.activated_id,
+        game.aces,
+        game.natural_21,
+        game.winner,
+        game.hand_counter,
+        game.unmasked_sum_sent,
+        game.bet,
+        game.bet_list,
+        game.is_round_active,
+    )
+
+
+def encode(game):
+    """A Game teljes állapota JSON szövegként (Redis SET érték)."""
+    return _encoder.encode(_state(game)).decode()
+
+
+def encode_fields(game) -> Dict[str, str]:
+    """A Game állapota hash mezőnként: {mezőnév: JSON szöveg}."""
+    state = _state(game)
+    encode_value = _encoder.encode
+    fields = {
+        name: encode_value(getattr(state, name)).decode()
+        for name in state.__struct_fields__
+    }
+    fields[VERSION_FIELD] = str(SCHEMA_VERSION)
+
+    return fields
+
+
+def _seat(state):
+    return Seat(
+        state.id,
+        Hand(state.hand),
+        state.hand_state,
+        state.can_split,
+        state.stated,
+        state.bet,
+    )
+
+
+def _shoe(state):
+    shoe = Shoe(state.decks, state.penetration)
+    if state.seed is not None:
+        shoe.seed = state.seed
+        shoe._cards = None
+        shoe._count = shoe.size
+    else:
+        shoe.cards = state.cards
+    shoe.cursor = state.cursor
+    shoe.running_count = state.running_count
+    shoe.rank_counts = state.rank_counts
+
+    return shoe
+
+
+def _build_game(state):
+    # Game.__init__ nélkül: minden mezőt az állapotból töltünk fel
+    game = Game.__new__(Game)
+    game.shoe = _shoe(state.shoe)
+    game.hands = hands = [_seat(seat) for seat in state.hands]
+    game.cursor = state.cursor
+    game.player = hands[state.cursor] if hands else _seat(state.player)
+    game.dealer = Dealer(
+        Hand(state.dealer.hand), state.dealer.hand_state, state.dealer.natural_21
+    )
+    game.paying = state.paying
+    game.max_splits = state.max_splits
+    game.activated_id = state.activated_id
+    game.aces = state.aces
+    game.natural_21 = state.natural_21
+    game.winner = state.winner
+    game.hand_counter = state.hand_counter
+    game.stated = False
+    game.unmasked_sum_sent = state.unmasked_sum_sent
+    game.bet = state.bet
+    game.bet_list = state.bet_list
+    game.is_round_active = state.is_round_active
+
+    return game
+
+
+def decode(raw):
+    """Game a Redisből olvasott értékből (str vagy bytes).
+
+    A régi, Game.serialize() szótáras formátumát is elfogadja.
+    Hibás adatnál msgspec.DecodeError / ValidationError, illetve ValueError.
+    """
+    if isinstance(raw, str):
+        raw = raw.encode("utf-8")
+    if raw.lstrip()[:1] == b"{":
+        return Game.deserialize(json.loads(raw))
+
+    return _build_game(_decoder.decode(raw))
+
+
+def decode_fields(fields):
+    """Game az encode_fields kimenetéből (pl. HGETALL; kulcs és érték lehet bytes).
+
+    Hiányzó mező vagy ismeretlen verzió esetén ValueError.
+    """
+    fields = {
+        (name.decode() if isinstance(name, bytes) else name): value
+        for name, value in fields.items()
+    }
+    version = int(fields.get(VERSION_FIELD, 0))
+    if version not in _SCHEMAS:
+        raise ValueError(f"Unknown game state schema version: {version}.")
+
+    values = {}
+    for name, decoder in _FIELD_DECODERS[version].items():
+        if name not in fields:
+            raise ValueError(f"Missing game state field: {name!r}.")
+        values[name] = decoder.decode(fields[name])
+
+    return _build_game(_SCHEMAS[version](**values))
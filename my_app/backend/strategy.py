@@ -0,0 +1,252 @@
+import argparse
+import mmap
+import os
+import struct
+import time
+
+import numpy as np
+
+from my_app.backend.action import Action
+from my_app.backend.dealer_odds import BLACKJACK, BUST, DEALER_TOTALS, dealer_outcomes
+from my_app.backend.game import MAX_SPLITS
+from my_app.backend.hand import BLACKJACK_LIMIT
+from my_app.backend.shoe import DEFAULT_DECKS, MAX_DECKS, MIN_DECKS
+from my_app.backend.simulator import MULTI_CARD, PAIR, POLICY_SHAPE, TWO_CARD
+
+DEFAULT_TABLE_PATH = os.path.join(os.path.dirname(__file__), "strategy.bin")
+
+# Fájlformátum: fejléc, majd POLICY_SHAPE szerinti C-sorrendű Action bájtok,
+# végül felfordított laponként (0..10) egy biztosítás jelző bájt.
+MAGIC = b"BJST"
+VERSION = 1
+_HEADER = struct.Struct("<4sHHH")  # magic, verzió, paklik, split keret
+_TOTALS, _SOFTS, _CATEGORIES, _UPCARDS = POLICY_SHAPE
+_TABLE_SIZE = _TOTALS * _SOFTS * _CATEGORIES * _UPCARDS
+_INSURANCE_OFFSET = _HEADER.size + _TABLE_SIZE
+_FILE_SIZE = _INSURANCE_OFFSET + _UPCARDS
+
+# Egy sor a táblában: (összeg, soft) -> bájt eltolás
+_STRIDE_TOTAL = _SOFTS * _CATEGORIES * _UPCARDS
+_STRIDE_SOFT = _CATEGORIES * _UPCARDS
+_STRIDE_CATEGORY = _UPCARDS
+
+
+def _offset(total, soft, category, upcard):
+    return (
+        _HEADER.size
+        + total * _STRIDE_TOTAL
+        + soft * _STRIDE_SOFT
+        + category * _STRIDE_CATEGORY
+        + upcard
+    )
+
+
+class UpcardEv:
+    """Egy felfordított laphoz tartozó játékos EV-k (végtelen cipő közelítés).
+
+    remaining: a nem látott lapok értékenként, a felfordított lap nélkül.
+    Az osztói eloszlás pontos (dealer_odds); a játékos lapjai a remaining
+    arányaival érkeznek. Nincs peek: osztói BJ
+    esetén minden (duplázott, splitelt) tét elvész.
+    """
+
+    def __init__(self, upcard, remaining):
+        total = sum(remaining)
+        self.probs = [count / total for count in remaining]
+        self.dealer = dealer_outcomes(upcard, remaining)
+        self._stand = {}
+        self._multi = {}
+        self._split = {}
+
+    @staticmethod
+    def _total(hard, has_ace):
+        if has_ace and hard + 10 <= BLACKJACK_LIMIT:
+            return hard + 10
+        return hard
+
+    def stand(self, total):
+        if total in self._stand:
+            return self._stand[total]
+        dealer = self.dealer
+        if total > BLACKJACK_LIMIT:
+            ev = -1.0
+        else:
+            ev = dealer[BUST] - dealer[BLACKJACK]
+            for index, dealer_total in enumerate(DEALER_TOTALS):
+                if total > dealer_total:
+                    ev += dealer[index]
+                elif total < dealer_total:
+                    ev -= dealer[index]
+        self._stand[total] = ev
+
+        return ev
+
+    def _draw(self, hard, has_ace, value):
+        return hard + value, has_ace or value == 1
+
+    def hit(self, hard, has_ace):
+        ev = 0.0
+        for value, p in enumerate(self.probs, 1):
+            if p:
+                ev += p * self.multi(*self._draw(hard, has_ace, value))[0]
+        return ev
+
+    def double(self, hard, has_ace):
+        ev = 0.0
+        for value, p in enumerate(self.probs, 1):
+            if p:
+                ev += p * self.stand(self._total(*self._draw(hard, has_ace, value)))
+        return 2 * ev
+
+    def multi(self, hard, has_ace):
+        """Legjobb (ev, action) többlapos kézre: csak állás vagy lapkérés."""
+        key = (hard, has_ace)
+        if key in self._multi:
+            return self._multi[key]
+        total = self._total(hard, has_ace)
+        stand = self.stand(total)
+        if total >= BLACKJACK_LIMIT:
+            best = (stand, Action.STAND)
+        else:
+            best = max((stand, Action.STAND), (self.hit(hard, has_ace), Action.HIT))
+        self._multi[key] = best
+
+        return best
+
+    def two_card(self, hard, has_ace):
+        total = self._total(hard, has_ace)
+        if total >= BLACKJACK_LIMIT:
+            return (self.stand(total), Action.STAND)
+        return max(
+            self.multi(hard, has_ace),
+            (self.double(hard, has_ace), Action.DOUBLE),
+        )
+
+    def split(self, value, splits_left):
+        """Split EV; a közös split keretet ágankénti kerettel közelítjük."""
+        key = (value, splits_left)
+        if key in self._split:
+            return self._split[key]
+        ev = 0.0
+        for drawn, p in enumerate(self.probs, 1):
+            if not p:
+                continue
+            hard, has_ace = self._draw(value, value == 1, drawn)
+            if value == 1:
+                # Split ászok: egy lap után kötelező megállni
+                hand_ev = self.stand(self._total(hard, has_ace))
+            else:
+                hand_ev = self.two_card(hard, has_ace)[0]
+                if drawn == value and splits_left > 1:
+                    hand_ev = max(hand_ev, self.split(value, splits_left - 1))
+            ev += p * hand_ev
+        self._split[key] = 2 * ev
+
+        return 2 * ev
+
+    def insurance(self):
+        # Game.insurance_request: osztói BJ-nél +tét, különben -ceil(tét / 2)
+        p = self.dealer[BLACKJACK]
+        return p - (1 - p) / 2 > 0
+
+
+def generate(decks=DEFAULT_DECKS, max_splits=MAX_SPLITS):
+    """A teljes döntési tábla és a biztosítás jelzők bájtokként."""
+    if not MIN_DECKS <= decks <= MAX_DECKS:
+        raise ValueError(
+            f"Deck count must be between {MIN_DECKS} and {MAX_DECKS}, got {decks}."
+        )
+    if max_splits < 0:
+        raise ValueError(f"Split limit must not be negative, got {max_splits}.")
+
+    counts = [4 * decks] * 9 + [16 * decks]
+    table = bytearray([Action.HIT]) * _TABLE_SIZE
+    insurance = bytearray(_UPCARDS)
+
+    for upcard in range(1, _UPCARDS):
+        remaining = list(counts)
+        remaining[upcard - 1] -= 1
+        ev = UpcardEv(upcard, remaining)
+        insurance[upcard] = ev.insurance()
+
+        for total in range(4, _TOTALS):
+            for soft in (0, 1):
+                if soft and total < 12:
+                    continue
+                hard, has_ace = total - 10 * soft, bool(soft)
+                base = _offset(total, soft, 0, upcard) - _HEADER.size
+                multi = ev.multi(hard, has_ace)[1]
+                two = ev.two_card(hard, has_ace)[1]
+                table[base + MULTI_CARD * _STRIDE_CATEGORY] = multi
+                table[base + TWO_CARD * _STRIDE_CATEGORY] = two
+                table[base + PAIR * _STRIDE_CATEGORY] = two
+
+        for value in range(1, 11):
+            total, soft = (12, 1) if value == 1 else (2 * value, 0)
+            hard, has_ace = 2 * value, value == 1
+            best = ev.two_card(hard, has_ace)
+            if max_splits:
+                best = max(best, (ev.split(value, max_splits), Action.SPLIT))
+            table[_offset(total, soft, PAIR, upcard) - _HEADER.size] = best[1]
+
+    return bytes(table), bytes(insurance)
+
+
+def write_table(path, decks=DEFAULT_DECKS, max_splits=MAX_SPLITS):
+    table, insurance = generate(decks, max_splits)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, decks, max_splits))
+        f.write(table)
+        f.write(insurance)
+    # Atomikus csere: a futó folyamatok a régi fájlt látják tovább
+    os.replace(tmp_path, path)
+
+
+class StrategyTable:
+    """Memóriába leképzett döntési tábla; a lekérdezés O(1), nem allokál."""
+
+    def __init__(self, path=DEFAULT_TABLE_PATH):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) != _FILE_SIZE:
+            self._map.close()
+            raise ValueError(f"Strategy table {path} has unexpected size.")
+        magic, version, self.decks, self.max_splits = _HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f"Strategy table {path} has unsupported format.")
+
+    def action(self, total, soft, category, upcard):
+        return self._map[_offset(total, soft, category, upcard)]
+
+    def should_insure(self, upcard):
+        return bool(self._map[_INSURANCE_OFFSET + upcard])
+
+    def as_policy(self):
+        """Másolás nélküli numpy nézet a szimulátor policy paraméteréhez."""
+        return np.frombuffer(
+            self._map, dtype=np.uint8, count=_TABLE_SIZE, offset=_HEADER.size
+        ).reshape(POLICY_SHAPE)
+
+    def close(self):
+        self._map.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Alapstratégia tábla generálása a Game szabályaival."
+    )
+    parser.add_argument("--decks", type=int, default=DEFAULT_DECKS)
+    parser.add_argument("--max-splits", type=int, default=MAX_SPLITS)
+    parser.add_argument("--out", default=DEFAULT_TABLE_PATH)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    write_table(args.out, args.decks, args.max_splits)
+    elapsed = time.perf_counter() - started
+    print(f"{args.out}: {args.decks} pakli, {args.max_splits} split, {elapsed:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
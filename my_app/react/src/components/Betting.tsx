@@ -19,7 +19,7 @@ const Betting: React.FC<BettingProps> = ({
   onStartGame,
   isWFSR,
 }) => {
-  const { tokens, bet, deck_len } = gameState;
+  const { tokens, bet, needs_shuffle } = gameState;
 
   const [showButtons, setShowButtons] = useState(false);
   const timeoutIdRef = useRef<number | null>(null);
@@ -43,8 +43,8 @@ const Betting: React.FC<BettingProps> = ({
   };
 
   const handleStartGame = async () => {
-    const shouldShuffle = deck_len === 0 || deck_len === 104 || deck_len < 60;
-    onStartGame(shouldShuffle);
+    // A vágókártyát a szerver kezeli; a kliens csak a keverés animációját indítja
+    onStartGame(needs_shuffle);
   };
 
   const isDisabled = bet === 0;
@@ -59,6 +59,7 @@ const initialGameState: GameStateData = {
   players: {},
   split_req: 0,
   deck_len: 104,
+  needs_shuffle: false,
   tokens: 0,
   bet: 0,
   bet_list: [],
@@ -29,6 +29,7 @@ export interface GameStateData {
   players: Record<string, PlayerData>;
   split_req: number;
   deck_len: number;
+  needs_shuffle: boolean;
   tokens: number;
   bet: number;
   bet_list: number[];
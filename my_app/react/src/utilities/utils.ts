@@ -80,6 +80,7 @@ export function extractGameStateData1(
       players: rawGameState.players as Record<string, PlayerData>,
       split_req: rawGameState.split_req as number,
       deck_len: rawGameState.deck_len as number,
+      needs_shuffle: rawGameState.needs_shuffle as boolean,
       tokens: token,
       bet: rawGameState.bet as number,
       bet_list: rawGameState.bet_list as number[],
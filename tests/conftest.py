@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+# Az app importja előtt: memóriabeli SQLite a Postgres helyett
+os.environ["DATABASE_URL_SIMPLE"] = "sqlite://"
+
+
+@pytest.fixture
+def redis_client():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # a Lua scriptekhez
+    return fakeredis.FakeRedis()
@@ -0,0 +1,194 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from redis.exceptions import ConnectionError
+
+from my_app.backend.game_store import (
+    BALANCE_KEY,
+    STATE_KEY,
+    VERSION_KEY,
+    RedisGameStore,
+)
+
+
+@pytest.fixture
+def app_module(monkeypatch):
+    from my_app.backend import app as app_module
+
+    app = app_module.app
+    # Redis nélkül: sütis session és memóriabeli játékállapot
+    monkeypatch.delitem(app.config, "REDIS_CLIENT", raising=False)
+    monkeypatch.setitem(app.config, "GAME_STORE", None)
+    with app.app_context():
+        app_module.db.create_all()
+    yield app_module
+    with app.app_context():
+        app_module.db.session.remove()
+        app_module.db.drop_all()
+    app_module.activity_buffer.drain()
+
+
+@pytest.fixture
+def redis_app(app_module, redis_client, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, "REDIS_CLIENT", redis_client)
+
+    return app_module
+
+
+def user_id(app_module, client_id="player-1"):
+    with app_module.app.app_context():
+        return app_module.User.query.filter_by(client_id=client_id).one().id
+
+
+def logged_in(app_module, client_id="player-1"):
+    client = app_module.app.test_client()
+    response = client.post("/api/initialize_session", json={"client_id": client_id})
+    assert response.status_code == 200
+
+    return client
+
+
+@pytest.mark.parametrize("backend", ["memory", "file"])
+def test_session_and_game_state_work_without_redis(
+    app_module, backend, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(app_module, "GAME_STORE_BACKEND", backend)
+    monkeypatch.setattr(app_module, "GAME_STORE_PATH", str(tmp_path / "states.log"))
+    client = logged_in(app_module)
+
+    response = client.post("/api/bet", json={"bet": 10})
+    repeated = client.post("/api/bet", json={"bet": 5})
+
+    assert response.status_code == 200
+    assert repeated.get_json()["game_state"]["bet"] == 15
+    with app_module.app.app_context():
+        assert app_module.User.query.one().tokens == 985
+    if backend == "file":
+        app_module.app.config["GAME_STORE"].close()
+
+
+def test_corrupt_state_starts_a_new_game(redis_app, redis_client):
+    client = logged_in(redis_app)
+    client.post("/api/bet", json={"bet": 10})
+    redis_app.app.config["GAME_STORE"].forget(user_id(redis_app))
+    redis_client.hset(STATE_KEY.format(user_id(redis_app)), "shoe", "[1,")
+
+    response = client.post("/api/bet", json={"bet": 5})
+
+    assert response.status_code == 200
+    assert response.get_json()["game_state"]["bet"] == 5
+
+
+def test_store_error_does_not_overwrite_the_state(
+    redis_app, redis_client, monkeypatch
+):
+    client = logged_in(redis_app)
+    client.post("/api/bet", json={"bet": 10})
+    key = STATE_KEY.format(user_id(redis_app))
+    redis_app.app.config["GAME_STORE"].forget(user_id(redis_app))
+    before = redis_client.hgetall(key)
+
+    def unreachable(self, user_id):
+        raise ConnectionError("Redis down")
+
+    monkeypatch.setattr(RedisGameStore, "_read", unreachable)
+    response = client.post("/api/bet", json={"bet": 5})
+
+    assert response.status_code == 500
+    assert redis_client.hgetall(key) == before
+
+
+def conflicting_saves(monkeypatch, redis_client, count):
+    """A következő count db mentés előtt egy "másik kérés" lépteti a verziót."""
+    original = RedisGameStore.save
+    remaining = {"count": count}
+
+    def save(self, user_id, game, stored=None, *args, **kwargs):
+        if remaining["count"] and stored is not None:
+            remaining["count"] -= 1
+            redis_client.incr(VERSION_KEY.format(user_id))
+        return original(self, user_id, game, stored, *args, **kwargs)
+
+    monkeypatch.setattr(RedisGameStore, "save", save)
+
+
+def test_conflict_is_retried_and_tokens_change_once(
+    redis_app, redis_client, monkeypatch
+):
+    client = logged_in(redis_app)
+    conflicting_saves(monkeypatch, redis_client, redis_app.GAME_SAVE_RETRIES - 1)
+
+    response = client.post("/api/bet", json={"bet": 10})
+
+    assert response.status_code == 200
+    assert response.get_json()["current_tokens"] == 990
+    assert redis_client.get(BALANCE_KEY.format(user_id(redis_app))) == b"990"
+
+
+def test_retry_exhaustion_returns_409(redis_app, redis_client, monkeypatch):
+    client = logged_in(redis_app)
+    conflicting_saves(monkeypatch, redis_client, redis_app.GAME_SAVE_RETRIES)
+
+    response = client.post("/api/bet", json={"bet": 10})
+
+    assert response.status_code == 409
+    assert response.get_json()["game_state_hint"] == "GAME_STATE_CONFLICT"
+    assert redis_client.get(BALANCE_KEY.format(user_id(redis_app))) is None
+
+
+def test_reaper_purges_only_idle_users(redis_app, redis_client):
+    for index in range(5):
+        client = logged_in(redis_app, f"player-{index}")
+        client.post("/api/bet", json={"bet": 10})
+    idle = {user_id(redis_app, f"player-{index}") for index in (0, 1)}
+
+    with redis_app.app.app_context():
+        redis_app.flush_activity(force=True)
+        long_ago = datetime.now(timezone.utc) - timedelta(days=40)
+        for user in redis_app.User.query.filter(redis_app.User.id.in_(idle)):
+            user.last_activity = long_ago
+        redis_app.db.session.commit()
+
+        report = redis_app.reap_idle_game_states(idle_days=31, batch_size=2)
+
+        assert report["purged"] == 2
+        assert report["reclaimed_bytes"] > 0
+        remaining = {
+            key.decode()[len(STATE_KEY.format("")):]
+            for key in redis_client.scan_iter(STATE_KEY.format("*"))
+        }
+        assert remaining.isdisjoint(idle) and len(remaining) == 3
+        # A törölt egyenlegek előbb az adatbázisba kerültek
+        assert {user.tokens for user in redis_app.User.query} == {990}
+
+
+@pytest.mark.parametrize("bet", [2.5, 10.0, True, "10", 0, -5])
+def test_bet_must_be_a_positive_integer(redis_app, redis_client, bet):
+    client = logged_in(redis_app)
+
+    response = client.post("/api/bet", json={"bet": bet})
+
+    assert response.status_code == 400
+    assert redis_client.get(BALANCE_KEY.format(user_id(redis_app))) is None
+    assert client.post("/api/bet", json={"bet": 10}).status_code == 200
+
+
+def test_bet_above_balance_is_refused(redis_app):
+    client = logged_in(redis_app)
+
+    response = client.post("/api/bet", json={"bet": 1001})
+
+    assert response.status_code == 400
+    assert response.get_json()["game_state_hint"] == "NOT_ENOUGH_TOKENS_FOR_BET"
+
+
+def test_reconcile_writes_balance_to_database(redis_app):
+    client = logged_in(redis_app)
+    client.post("/api/bet", json={"bet": 10})
+
+    with redis_app.app.app_context():
+        assert redis_app.User.query.one().tokens == 1000
+        assert redis_app.reconcile_tokens(force=True) == 1
+        redis_app.db.session.expire_all()
+        assert redis_app.User.query.one().tokens == 990
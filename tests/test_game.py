@@ -0,0 +1,137 @@
+from my_app.backend.card import CARDS_PER_DECK, HI_LO_VALUES, to_cards
+from my_app.backend.game import Game
+from my_app.backend.shoe import Shoe
+
+BET = 10
+
+
+def stacked_game(labels, decks=1):
+    """Game egy cipővel, amelynek eleje a megadott lapsorrend.
+
+    Osztási sorrend: játékos, osztó lefordított lap, játékos, osztó felfordított lap.
+    """
+    prefix = to_cards(labels)
+    rest = Shoe.order_from_seed(5, decks)
+    for card in prefix:
+        rest.remove(card)
+    game = Game(decks)
+    game.shoe = Shoe.from_cards(prefix + rest, decks)
+    game.set_bet(BET)
+    game.set_bet_list(BET)
+
+    return game
+
+
+# --- Hi-Lo számlálás ---
+
+
+def test_running_count_follows_the_draws():
+    game = stacked_game(["♥2", "♠K", "♦5", "♣9", "♥6"])
+    shoe = game.shoe
+
+    drawn = [shoe.draw() for _ in range(5)]
+
+    assert shoe.running_count == sum(HI_LO_VALUES[card] for card in drawn) == 2
+    assert sum(shoe.rank_counts) == CARDS_PER_DECK - 5
+    assert shoe.rank_counts[5] == 3  # egy hatos már kint van
+
+
+def test_count_excludes_the_masked_hole_card():
+    game = stacked_game(["♥2", "♠K", "♦5", "♣6"])  # a lefordított lap a ♠K
+    game.initialize_new_round()
+
+    state = game.get_count_state()
+
+    assert game.shoe.running_count == 2
+    assert state["running_count"] == 3  # 2 + 5 + 6, a K nélkül
+    assert state["rank_counts"][12] == 4  # a K még nem látott lap
+    assert state["true_count"] == round(3 * CARDS_PER_DECK / (CARDS_PER_DECK - 3), 2)
+
+    game.unmasked_sum_sent = True
+    assert game.get_count_state()["running_count"] == 2
+
+
+def test_true_count_scales_with_the_remaining_decks():
+    game = stacked_game(["♥2", "♠3", "♦4", "♣5"], decks=2)
+    for _ in range(4):
+        game.shoe.draw()
+
+    assert game.shoe.true_count == 4 * CARDS_PER_DECK / (2 * CARDS_PER_DECK - 4)
+
+
+# --- Split kezek sora ---
+
+SPLIT_EIGHTS = ["♥8", "♠10", "♦8", "♣6", "♥3", "♠2"]
+
+
+def split_game():
+    game = stacked_game(SPLIT_EIGHTS)
+    game.initialize_new_round()
+    game.split_hand()
+
+    return game
+
+
+def hand_ids(game):
+    return [seat.id for seat in game.hands]
+
+
+def test_split_queue_moves_the_cursor_in_id_order():
+    game = split_game()
+
+    assert hand_ids(game) == ["H-001", "H-002"]
+    assert game.cursor == 0 and game.player.id == "H-001"
+    assert game.split_req == 1
+
+    game.add_to_players_list_by_stand()
+    game.add_split_player_to_game()
+
+    assert game.cursor == 1 and game.player.id == "H-002"
+    assert game.split_req == 0
+    assert [seat.id for seat in game.players] == ["H-001"]
+
+    # Kifizetés: a megállt kezek id sorrendben jönnek
+    game.stand()
+    game.rewards()
+    assert game.waiting_count == 1
+    assert game.add_player_from_players().id == "H-001"
+    assert game.paying and game.waiting_count == 0
+
+
+def legacy_data(game):
+    """A hands/cursor előtti formátum: id szerint rendezett players lista."""
+    data = game.serialize()
+    for key in ("hands", "cursor", "paying", "activated_id", "max_splits"):
+        del data[key]
+    data["players"] = [seat.serialize() for seat in game.players]
+    data["split_player"] = {"id": game.activated_id}
+
+    return data
+
+
+def test_legacy_players_are_migrated_to_the_queue():
+    game = split_game()
+    game.add_to_players_list_by_stand()
+    waiting = Game.deserialize(legacy_data(game))
+
+    assert hand_ids(waiting) == ["H-001", "H-002"]
+    assert waiting.cursor == 0 and waiting.player.stated
+
+    game.add_split_player_to_game()
+    active = Game.deserialize(legacy_data(game))
+
+    assert hand_ids(active) == ["H-001", "H-002"]
+    assert active.cursor == 1 and active.player.hand.cards == game.player.hand.cards
+
+
+def test_repeated_activation_is_replayed_without_a_draw():
+    game = split_game()
+    game.add_to_players_list_by_stand()
+
+    first = game.add_split_player_to_game()
+    cursor = game.shoe.cursor
+    again = game.add_split_player_to_game()
+
+    assert again is first and game.activated_id == "H-002"
+    assert game.shoe.cursor == cursor
+    assert len(first.hand) == 2
@@ -0,0 +1,346 @@
+import os
+
+import pytest
+
+from my_app.backend import game_store
+from my_app.backend.game import Game
+from my_app.backend.game_store import (
+    BALANCE_KEY,
+    DIRTY_KEY,
+    RECONCILE_LOCK_KEY,
+    RECONCILING_KEY,
+    STATE_KEY,
+    VERSION_KEY,
+    FileGameStore,
+    MemoryGameStore,
+    RedisGameStore,
+    StateConflict,
+)
+
+TTL = 3600
+
+
+@pytest.fixture(params=["memory", "file", "redis"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        yield MemoryGameStore()
+    elif request.param == "file":
+        store = FileGameStore(str(tmp_path / "states.log"))
+        yield store
+        store.close()
+    else:
+        yield RedisGameStore(request.getfixturevalue("redis_client"), ttl=TTL)
+
+
+# --- Változott mezők mentése (minden backend) ---
+
+
+def test_save_and_load_round_trip(store):
+    game = Game()
+    game.bet = 25
+    store.save("u1", game)
+    store.forget("u1")
+
+    loaded, stored = store.load("u1")
+
+    assert loaded.bet == 25
+    assert stored.fields and not stored.cached
+
+
+def test_unchanged_save_writes_nothing(store):
+    store.save("u1", Game())
+    store.forget("u1")
+    game, stored = store.load("u1")
+
+    assert store.save("u1", game, stored) == 0
+
+
+def test_only_changed_fields_are_written(store):
+    store.save("u1", Game())
+    store.forget("u1")
+    game, stored = store.load("u1")
+    game.bet = 5
+    game.bet_list.append(5)
+
+    assert store.save("u1", game, stored) == 2
+
+
+def test_redis_read_does_not_touch_the_balance_ttl(redis_client):
+    store = RedisGameStore(redis_client, cache_size=0, ttl=TTL)
+    store.save("u1", Game(), tokens_delta=-10, tokens_seed=1000)
+    redis_client.expire(BALANCE_KEY.format("u1"), 60)
+
+    store.load("u1")
+
+    assert redis_client.ttl(BALANCE_KEY.format("u1")) <= 60
+
+
+# --- Compare-and-set ---
+
+
+def test_concurrent_save_raises_conflict(store):
+    store.save("u1", Game())
+    store.forget("u1")
+    first, first_stored = store.load("u1")
+    second, second_stored = store.load("u1")
+
+    first.bet = 10
+    store.save("u1", first, first_stored)
+    second.bet = 20
+    with pytest.raises(StateConflict):
+        store.save("u1", second, second_stored)
+
+    store.forget("u1")
+    assert store.load("u1")[0].bet == 10
+
+
+# --- L1 cache: több worker ugyanazon az állapoton ---
+
+
+def other_worker(store):
+    """Ugyanazt az állapotot látó második tároló, saját L1 cache-sel."""
+    if isinstance(store, RedisGameStore):
+        return RedisGameStore(store.client, ttl=TTL)
+    if isinstance(store, FileGameStore):
+        return FileGameStore(store.path)
+    return store
+
+
+def test_stale_cache_of_other_worker_cannot_save(store):
+    if type(store) is MemoryGameStore:
+        pytest.skip("egy folyamatos tároló: nincs második worker")
+    other = other_worker(store)
+    store.save("u1", Game())
+    game, stored = other.load("u1")
+    other.save("u1", game, stored)  # a második worker cache-eli
+
+    game, stored = store.load("u1")
+    game.bet = 5
+    store.save("u1", game, stored)
+
+    stale, stale_stored = other.load("u1")
+    assert stale_stored.cached
+    stale.bet = 99
+    with pytest.raises(StateConflict):
+        other.save("u1", stale, stale_stored)
+
+
+def test_deleted_state_cannot_be_restored_from_cache(store):
+    other = other_worker(store)
+    store.save("u1", Game())
+    game, stored = other.load("u1")
+    other.save("u1", game, stored)
+
+    assert store.delete("u1")
+    store.save("u1", Game())
+    for bet in range(1, 6):
+        game, stored = store.load("u1")
+        game.bet = bet
+        store.save("u1", game, stored)
+
+    if other is not store:
+        stale, stale_stored = other.load("u1")
+        with pytest.raises(StateConflict):
+            other.save("u1", stale, stale_stored)
+
+
+# --- Takarítás (reaper) ---
+
+
+def test_scan_yields_batches_and_purge_counts(store):
+    for index in range(7):
+        store.save(f"u{index}", Game())
+
+    batches = list(store.scan_user_ids(batch_size=3))
+    user_ids = {user_id for batch in batches for user_id in batch}
+
+    assert user_ids == {f"u{index}" for index in range(7)}
+    assert all(len(batch) <= 3 for batch in batches)
+
+    purged, size = store.purge(["u0", "u1", "missing"])
+    assert purged == 2 and size > 0
+    assert store.load("u0")[0] is None
+    assert store.load("u2")[0] is not None
+
+
+def test_redis_state_expires_and_purge_drops_the_version(redis_client):
+    store = RedisGameStore(redis_client, ttl=TTL)
+    store.save("u1", Game())
+
+    assert 0 < redis_client.ttl(STATE_KEY.format("u1")) <= TTL
+    assert store.purge(["u1"])[0] == 1
+    assert not redis_client.exists(STATE_KEY.format("u1"), VERSION_KEY.format("u1"))
+
+
+# --- FileGameStore: csonka rekord és tömörítés ---
+
+
+def test_file_store_recovers_torn_tail(tmp_path):
+    path = str(tmp_path / "states.log")
+    store = FileGameStore(path)
+    game = Game()
+    game.bet = 7
+    store.save("u1", game)
+    intact = os.path.getsize(path)
+    store.close()
+
+    # Leállás írás közben: a fejléc szerint hosszabb rekord, mint ami a fájlban van
+    with open(path, "ab") as f:
+        f.write(game_store._RECORD_HEADER.pack(100) + b'["u1",2,{"bet":')
+
+    reopened = FileGameStore(path)
+    loaded, stored = reopened.load("u1")
+    assert loaded.bet == 7
+
+    loaded.bet = 8
+    reopened.save("u1", loaded, stored)  # a következő író levágja a csonka véget
+    reopened.close()
+
+    assert os.path.getsize(path) > intact
+    fresh = FileGameStore(path)
+    assert fresh.load("u1")[0].bet == 8
+    fresh.close()
+
+
+def test_file_store_compacts_and_other_readers_follow(tmp_path, monkeypatch):
+    monkeypatch.setattr(game_store, "COMPACT_MIN_RECORDS", 5)
+    path = str(tmp_path / "states.log")
+    writer = FileGameStore(path)
+    reader = FileGameStore(path, cache_size=0)
+    writer.save("u1", Game())
+    writer.save("u2", Game())
+    reader.load("u1")
+    inode = os.stat(path).st_ino
+
+    for bet in range(1, 40):
+        game, stored = writer.load("u1")
+        game.bet = bet
+        writer.save("u1", game, stored)
+
+    assert os.stat(path).st_ino != inode
+    assert writer._records <= game_store.COMPACT_FACTOR * game_store.COMPACT_MIN_RECORDS
+    assert reader.load("u1")[0].bet == 39
+    assert reader.load("u2")[0] is not None
+    writer.close()
+    reader.close()
+
+
+# --- RedisGameStore: token egyenleg és egyeztetés ---
+
+
+@pytest.fixture
+def redis_store(redis_client):
+    return RedisGameStore(redis_client, ttl=TTL)
+
+
+def test_balance_changes_with_the_save(redis_store):
+    redis_store.save("u1", Game(), tokens_delta=-10, tokens_seed=1000)
+
+    assert redis_store.balance("u1") == 990
+    assert redis_store.client.sismember(DIRTY_KEY, "u1")
+
+
+def test_insufficient_funds_is_refused(redis_store):
+    redis_store.save("u1", Game(), tokens_delta=-10, tokens_seed=20)
+    game, stored = redis_store.load("u1")
+    game.bet = 50
+
+    with pytest.raises(StateConflict, match="Token balance"):
+        redis_store.save("u1", game, stored, tokens_delta=-50)
+
+    assert redis_store.balance("u1") == 10
+    redis_store.forget("u1")
+    assert redis_store.load("u1")[0].bet == 0
+
+
+def test_non_integer_token_change_is_refused(redis_store):
+    with pytest.raises(ValueError):
+        redis_store.save("u1", Game(), tokens_delta=2.5, tokens_seed=1000)
+    # A Lua script sem fogadja el, ha a Python ellenőrzés kimaradna
+    with pytest.raises(Exception, match="integer"):
+        redis_store._write("u1", "*", {}, False, 2.5, 1000)
+
+    assert redis_store.balance("u1") is None
+
+
+def test_reconcile_writes_dirty_balances_and_expires_them(redis_store):
+    client = redis_store.client
+    redis_store.save("u1", Game(), tokens_delta=-10, tokens_seed=1000)
+    redis_store.save("u2", Game(), tokens_delta=5, tokens_seed=100)
+    assert client.ttl(BALANCE_KEY.format("u1")) == -1  # piszkos: nem járhat le
+    written = {}
+
+    assert redis_store.reconcile_balances(written.update, batch_size=1) == 2
+
+    assert written == {"u1": 990, "u2": 105}
+    assert not client.exists(DIRTY_KEY, RECONCILING_KEY, RECONCILE_LOCK_KEY)
+    assert 0 < client.ttl(BALANCE_KEY.format("u1")) <= TTL
+
+
+def test_failed_reconcile_is_replayed(redis_store):
+    client = redis_store.client
+    redis_store.save("u1", Game(), tokens_delta=-10, tokens_seed=1000)
+
+    def fail(balances):
+        raise RuntimeError("database down")
+
+    with pytest.raises(RuntimeError):
+        redis_store.reconcile_balances(fail)
+    assert client.smembers(RECONCILING_KEY) == {b"u1"}
+    assert not client.exists(RECONCILE_LOCK_KEY)
+
+    # Közben újabb változás: a piszkos halmazba kerül, a félbemaradt köteg előbb fut
+    game, stored = redis_store.load("u1")
+    redis_store.save("u1", game, stored, tokens_delta=-5)
+    written = {}
+    assert redis_store.reconcile_balances(written.update) == 1
+    assert written == {"u1": 985}
+    assert client.smembers(DIRTY_KEY) == {b"u1"}
+
+    assert redis_store.reconcile_balances(written.update) == 1
+    assert not client.exists(DIRTY_KEY, RECONCILING_KEY)
+
+
+def test_reconcile_skips_bad_balance(redis_store):
+    client = redis_store.client
+    redis_store.save("u1", Game(), tokens_delta=-10, tokens_seed=1000)
+    client.set(BALANCE_KEY.format("u2"), "987.5")
+    client.sadd(DIRTY_KEY, "u2")
+    written = {}
+
+    assert redis_store.reconcile_balances(written.update) == 1
+
+    assert written == {"u1": 990}
+    assert not client.exists(RECONCILING_KEY)
+
+
+def test_reconcile_is_single_writer(redis_store):
+    redis_store.save("u1", Game(), tokens_delta=-10, tokens_seed=1000)
+    redis_store.client.set(RECONCILE_LOCK_KEY, "other")
+
+    assert redis_store.reconcile_balances(lambda balances: None) is None
+    assert redis_store.client.sismember(DIRTY_KEY, "u1")
+
+
+def test_purge_keeps_unreconciled_balance(redis_store):
+    client = redis_store.client
+    redis_store.save("u1", Game(), tokens_delta=-10, tokens_seed=1000)
+    redis_store.save("u2", Game(), tokens_delta=-10, tokens_seed=1000)
+    client.srem(DIRTY_KEY, "u2")  # u2 már az adatbázisban
+
+    assert redis_store.purge(["u1", "u2"])[0] == 2
+
+    assert client.get(BALANCE_KEY.format("u1")) == b"990"
+    assert not client.exists(BALANCE_KEY.format("u2"))
+    assert not client.exists(VERSION_KEY.format("u1"), VERSION_KEY.format("u2"))
+
+
+def test_orphan_balance_is_scanned_and_purged(redis_client):
+    store = RedisGameStore(redis_client)  # ttl nélkül: csak a purge törli
+    store.save("u1", Game(), tokens_delta=-10, tokens_seed=1000)
+    store.reconcile_balances(lambda balances: None)
+    redis_client.delete(STATE_KEY.format("u1"), VERSION_KEY.format("u1"))
+
+    assert [user_id for batch in store.scan_user_ids() for user_id in batch] == ["u1"]
+    assert store.purge(["u1"])[0] == 1
+    assert not redis_client.exists(BALANCE_KEY.format("u1"))
@@ -0,0 +1,27 @@
+import pytest
+
+from my_app.backend.card import to_cards
+from my_app.backend.hand import Hand
+
+
+@pytest.mark.parametrize(
+    "labels, total, soft",
+    [
+        (["♥2", "♠3"], 5, False),
+        (["♥A", "♠6"], 17, True),
+        (["♥A", "♠6", "♦10"], 17, False),  # az ász visszaesik 1-re
+        (["♥A", "♠A"], 12, True),  # csak egy ász számolható 11-nek
+        (["♥A", "♠A", "♦9"], 21, True),
+        (["♥A", "♠A", "♦10", "♣K"], 22, False),
+        (["♥K", "♠Q", "♦J"], 30, False),
+    ],
+)
+def test_running_total_and_soft_aces(labels, total, soft):
+    hand = Hand()
+    for card in to_cards(labels):
+        hand.add(card)
+
+    assert hand.total == total
+    assert hand.is_soft == soft
+    assert Hand(to_cards(labels)).total == total
+
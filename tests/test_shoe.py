@@ -0,0 +1,106 @@
+import random
+
+import pytest
+
+from my_app.backend.card import CARDS_PER_DECK
+from my_app.backend.game import Game
+from my_app.backend.shoe import Shoe
+
+
+def seeded_shoe(decks=1, penetration=0.75, seed=1):
+    shoe = Shoe(decks, penetration, random.Random(seed))
+    shoe.shuffle()
+
+    return shoe
+
+
+# --- Húzás, vágólap és újrakeverés ---
+
+
+def test_draw_follows_the_order_and_moves_the_cursor():
+    shoe = seeded_shoe()
+    order = list(shoe.cards)
+
+    drawn = [shoe.draw() for _ in range(5)]
+
+    assert drawn == order[:5]
+    assert shoe.cursor == 5
+    assert len(shoe) == CARDS_PER_DECK - 5
+    assert sorted(order) == list(range(CARDS_PER_DECK))
+
+
+def test_cut_card_marks_the_shoe_for_shuffle():
+    shoe = seeded_shoe(penetration=0.75)
+    dealt = int(shoe.size * 0.75)
+
+    for _ in range(dealt - 1):
+        shoe.draw()
+    assert not shoe.needs_shuffle
+    shoe.draw()
+    assert shoe.needs_shuffle
+
+    assert shoe.shuffle_if_needed()
+    assert shoe.cursor == 0 and len(shoe) == shoe.size
+    assert not shoe.shuffle_if_needed()
+
+
+def test_exhausted_shoe_reshuffles_on_draw():
+    shoe = seeded_shoe(penetration=1)
+    for _ in range(shoe.size):
+        shoe.draw()
+    seed = shoe.seed
+
+    shoe.draw()
+
+    assert shoe.seed != seed
+    assert shoe.cursor == 1
+
+
+def test_new_round_reshuffles_past_the_cut_card():
+    game = Game(1, rng=random.Random(3))
+    game.shoe.shuffle()
+    while not game.shoe.needs_shuffle:
+        game.shoe.draw()
+
+    game.initialize_new_round()
+
+    assert game.shoe.cursor == 4
+
+
+@pytest.mark.parametrize("decks, penetration", [(0, 0.75), (9, 0.75), (2, 0), (2, 1.5)])
+def test_invalid_shoe_is_refused(decks, penetration):
+    with pytest.raises(ValueError):
+        Shoe(decks, penetration)
+
+
+# --- Seed és kurzor mentése ---
+
+
+def test_same_seed_gives_the_same_order():
+    assert Shoe.order_from_seed(42, 2) == Shoe.order_from_seed(42, 2)
+    assert Shoe.order_from_seed(42, 2) != Shoe.order_from_seed(43, 2)
+
+
+def test_seeded_shoe_is_saved_as_seed_and_cursor():
+    shoe = seeded_shoe(decks=2)
+    for _ in range(30):
+        shoe.draw()
+
+    data = shoe.serialize()
+    restored = Shoe.deserialize(data)
+
+    assert "cards" not in data and data["seed"] == shoe.seed
+    assert restored.cursor == 30
+    assert restored.running_count == shoe.running_count
+    assert [restored.draw() for _ in range(20)] == [shoe.draw() for _ in range(20)]
+
+
+def test_stacked_shoe_keeps_its_card_order():
+    order = Shoe.order_from_seed(8, 1)[::-1]
+    shoe = Shoe.from_cards(order, 1)
+    shoe.draw()
+
+    restored = Shoe.deserialize(shoe.serialize())
+
+    assert restored.seed is None
+    assert restored.cards == order and restored.cursor == 1
@@ -0,0 +1,40 @@
+import sys
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from my_app.backend import simulator  # noqa: E402
+
+
+@pytest.mark.parametrize("options", [[], ["--insurance"], ["--max-splits", "1"]])
+def test_seeded_verify_run_matches_the_game_engine(options, monkeypatch, capsys):
+    argv = ["simulator", "--shoes", "200", "--seed", "7", "--verify", "40", *options]
+    monkeypatch.setattr(sys, "argv", argv)
+
+    simulator.main()  # eltérésnél SystemExit(1)
+
+    assert ", 0 eltérés" in capsys.readouterr().out
+
+
+def test_same_seed_gives_the_same_result():
+    first = simulator.simulate(50, seed=11)
+    second = simulator.simulate(50, seed=11)
+
+    assert (first.rounds, first.net) == (second.rounds, second.net)
+    assert first.rounds > 0
+
+
+@pytest.mark.parametrize("insurance, max_splits", [(False, 4), (True, 4), (False, 1)])
+def test_play_round_agrees_with_the_client_call_order(insurance, max_splits):
+    shoes = simulator.shuffled_shoes(30, rng=3)
+
+    game_net, game_rounds = simulator.play_shoes_with_game(
+        shoes, insurance=insurance, max_splits=max_splits
+    )
+    headless_net, headless_rounds = simulator.play_shoes_headless(
+        shoes, insurance=insurance, max_splits=max_splits
+    )
+
+    assert headless_net.tolist() == game_net.tolist()
+    assert headless_rounds.tolist() == game_rounds.tolist()
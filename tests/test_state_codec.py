@@ -0,0 +1,59 @@
+import json
+import random
+
+import pytest
+
+msgspec = pytest.importorskip("msgspec")
+
+from my_app.backend import state_codec  # noqa: E402
+from my_app.backend.game import Game  # noqa: E402
+
+
+def split_game():
+    game = Game(rng=random.Random(4))
+    game.set_bet(10)
+    game.set_bet_list(10)
+    game.initialize_new_round()
+    while not game.player.can_split:
+        game.initialize_new_round()
+    game.split_hand()
+    game.add_to_players_list_by_stand()
+
+    return game
+
+
+def comparable(game):
+    return game.serialize()
+
+
+def test_round_trip_keeps_the_whole_state():
+    game = split_game()
+
+    assert comparable(state_codec.decode(state_codec.encode(game))) == comparable(game)
+
+
+def test_field_round_trip_keeps_the_whole_state():
+    game = split_game()
+    fields = {
+        name.encode(): value.encode()
+        for name, value in state_codec.encode_fields(game).items()
+    }
+
+    assert comparable(state_codec.decode_fields(fields)) == comparable(game)
+
+
+def test_legacy_json_is_still_decoded():
+    game = split_game()
+
+    decoded = state_codec.decode(json.dumps(game.serialize()))
+
+    assert comparable(decoded) == comparable(game)
+
+
+def test_bad_state_raises_a_decode_error():
+    with pytest.raises(msgspec.DecodeError):
+        state_codec.decode(b"[1,")
+    fields = state_codec.encode_fields(Game())
+    del fields["shoe"]
+    with pytest.raises(ValueError, match="shoe"):
+        state_codec.decode_fields(fields)